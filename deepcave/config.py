@@ -10,6 +10,11 @@ working_dir = os.path.join(root, "examples", "logs", "DeepCAVE")
 CONFIG = {
     'CACHE_DIR': cache_dir,
     'REDIS_URL': "redis://localhost:6379",
+    # Number of processes which convert new or changed runs in parallel when runs are selected.
+    # Converted runs are stored in CACHE_DIR/runs and loaded from there afterwards.
+    # None uses all cores, 0 or 1 converts the runs in the main process.
+    # The processes are spawned, so converters (including plugin converters) must be importable.
+    'LOAD_PROCESSES': None,
 }
 
 # Meta information which are used across the platform
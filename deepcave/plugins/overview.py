@@ -13,6 +13,7 @@ from deepcave.plugins.static_plugin import StaticPlugin
 from deepcave.plugins.dynamic_plugin import DynamicPlugin
 from deepcave.utils.logs import get_logger
 from deepcave.runs.run import Status
+from deepcave.utils.resources import RESOURCES
 
 from deepcave.evaluators.fanova import fANOVA as _fANOVA
 
@@ -81,10 +82,8 @@ class Overview(DynamicPlugin):
                 stats[budget] = {}
 
                 for s in Status:
-                    stats[budget][s.name] = 0
-
-        for trial in run.history:
-            stats[trial.budget][trial.status.name] += 1
+                    stats[budget][s.name] = len(
+                        run.get_trial_ids(budgets=[budget], statuses=[s]))
 
         statistics = {
             "Budget": budgets,
@@ -109,10 +108,40 @@ class Overview(DynamicPlugin):
                 string = f"{count} ({percentage}%)"
                 statistics[s.name].append(string)
 
+        # Resources (if measured)
+        resources = {
+            "Budget": [],
+            "Measured Trials": [],
+            "Peak Memory (MB, mean)": [],
+            "Peak Memory (MB, max)": [],
+            "CPU Time (s, mean)": [],
+            "Wall Time (s, mean)": [],
+        }
+        for budget in budgets:
+            values = run.get_resources(budget=budget)
+            values = values[~np.all(np.isnan(values), axis=1)]
+            if len(values) == 0:
+                continue
+
+            def aggregate(function, name):
+                column = values[:, RESOURCES.index(name)]
+                if np.all(np.isnan(column)):
+                    return "-"
+
+                return str(np.round(function(column), 2))
+
+            resources["Budget"].append(budget)
+            resources["Measured Trials"].append(len(values))
+            resources["Peak Memory (MB, mean)"].append(aggregate(np.nanmean, "peak_memory"))
+            resources["Peak Memory (MB, max)"].append(aggregate(np.nanmax, "peak_memory"))
+            resources["CPU Time (s, mean)"].append(aggregate(np.nanmean, "cpu_time"))
+            resources["Wall Time (s, mean)"].append(aggregate(np.nanmean, "wall_time"))
+
         return {
             "meta": meta,
             "objectives": objectives,
             "statistics": statistics,
+            "resources": resources,
         }
 
     @staticmethod
@@ -129,6 +158,10 @@ class Overview(DynamicPlugin):
             html.H3("Statistics"),
             html.Div(id=register("statistics", "children")),
             html.Hr(),
+
+            html.H3("Resources"),
+            html.Div(id=register("resources", "children")),
+            html.Hr(),
         ]
 
     @staticmethod
@@ -140,8 +173,14 @@ class Overview(DynamicPlugin):
             pd.DataFrame(output), striped=True, bordered=True
         )
 
+        if len(outputs["resources"]["Budget"]) > 0:
+            resources = create_table(outputs["resources"])
+        else:
+            resources = html.P("No resources were measured.")
+
         return [
             create_table(outputs["meta"]),
             create_table(outputs["objectives"]),
             create_table(outputs["statistics"]),
+            resources,
         ]
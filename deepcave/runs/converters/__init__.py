@@ -0,0 +1,80 @@
+from deepcave.utils.logs import get_logger
+
+logger = get_logger(__name__)
+
+
+# Entry point group of converters from other packages
+ENTRY_POINT_GROUP = "deepcave.converters"
+
+# Converter classes by name. Built once per process by `get_converters`.
+_converters = None
+
+# Explicitly registered converter classes, which are added to the built-in ones
+_registered = {}
+
+
+def register_converter(converter):
+    """
+    Registers a converter class, e.g. from another package. A converter with the same name
+    is replaced. Should be called before the working directory is selected, because the
+    handler remembers the converter of a working directory.
+
+    Args:
+        converter (Type[Converter]): The converter class.
+
+    Returns:
+        The converter class, so that it can be used as decorator.
+    """
+
+    _registered[converter.name()] = converter
+    if _converters is not None:
+        _converters[converter.name()] = converter
+
+    return converter
+
+
+def get_converters():
+    """
+    Returns the available converters: The built-in ones, the ones from the entry point group
+    `deepcave.converters` and the registered ones. They are only imported once per process.
+
+    Returns:
+        dict: Converter classes by name, in the order they are tried.
+    """
+
+    global _converters
+    if _converters is None:
+        from deepcave.runs.converters.bohb import BOHB
+        from deepcave.runs.converters.deepcave import DeepCAVE
+        from deepcave.runs.converters.smac import SMAC
+
+        converters = {}
+        for converter in [BOHB, DeepCAVE, SMAC] + _load_entry_points():
+            converters[converter.name()] = converter
+
+        converters.update(_registered)
+        _converters = converters
+
+    return _converters
+
+
+def _load_entry_points():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        eps = eps.select(group=ENTRY_POINT_GROUP)
+    else:
+        eps = eps.get(ENTRY_POINT_GROUP, [])
+
+    converters = []
+    for ep in eps:
+        try:
+            converters.append(ep.load())
+        except Exception:
+            logger.exception(f"Problem when loading converter {ep.name} from entry point {ep.value}")
+
+    return converters
@@ -1,6 +1,7 @@
 import os
-import json
 import glob
+import array
+import numpy as np
 import pandas as pd
 from typing import Dict, Type, Any
 
@@ -9,7 +10,8 @@ from deepcave.runs.run import Status
 from deepcave.runs.converters.converter import Converter
 from deepcave.runs.run import Run
 from deepcave.runs.objective import Objective
-from deepcave.utils.hash import file_to_hash
+from deepcave.utils.hash import file_to_fingerprint
+from deepcave.utils.files import read_head, read_jsonlines
 
 
 class BOHB(Converter):
@@ -17,14 +19,27 @@ class BOHB(Converter):
     def name() -> str:
         return "BOHB"
 
+    @staticmethod
+    def required_files() -> list:
+        return ["configspace.json", "configs.json", "results.json"]
+
+    def sniff(self, path) -> bool:
+        # Every line is a list, but the files might be empty
+        for filename in ["configs.json", "results.json"]:
+            head = read_head(os.path.join(path, filename))
+            if head and not head.startswith(b"["):
+                return False
+
+        return True
+
     def get_run_id(self, working_dir, run_name) -> str:
         """
         The id from the files in the current working_dir/run_name/*. For example, history.json could be read and hashed.
         Idea behind: If id changed, then we have to update cached trials.
         """
 
-        # Use hash of history.json as id
-        return file_to_hash(os.path.join(working_dir, run_name, "results.json"))
+        # The fingerprint is memoized, so that unchanged runs are not read again
+        return file_to_fingerprint(os.path.join(working_dir, run_name, "results.json"))
 
     def get_run(self, working_dir, run_name) -> Run:
         """
@@ -49,56 +64,79 @@ class BOHB(Converter):
             meta={}
         )
 
-        from hpbandster.core.result import logged_results_to_HBS_result
-        bohb = logged_results_to_HBS_result(base)
-
-        first_starttime = None
-        for bohb_run in bohb.get_all_runs():
-
-            times = bohb_run.time_stamps
-            starttime = times["started"]
-            endtime = times["finished"]
-
-            if first_starttime is None:
-                first_starttime = starttime
-
-            starttime = starttime - first_starttime
-            endtime = endtime - first_starttime
-
-            cost = bohb_run.loss
-            budget = bohb_run.budget
-            config = bohb_run.info["config"]
-            # Convert str to dict
-            config = json.loads(config)
-
-            origin = None
-            additional = {}
-            status = bohb_run.info["state"]
-
-            # QUEUED, RUNNING, CRASHED, REVIEW, TERMINATED, COMPLETED, SUCCESS
-            if "SUCCESS" in status or "TERMINATED" in status or "COMPLETED" in status:
+        # configs.json and results.json are read line by line (same as hpbandster does)
+        # Every line of configs.json is [config_id, config, config_info]
+        configs = {}
+        for (config_id, config, _), _ in read_jsonlines(os.path.join(base, "configs.json")):
+            configs[tuple(config_id)] = config
+
+        # Runs are ordered by config (as in configs.json), then by result
+        config_order = {config_id: i for i, config_id in enumerate(configs)}
+
+        # Every line of results.json is [config_id, budget, time_stamps, result, exception]
+        trial_config_ids = []
+        orders = array.array("q")
+        budgets = array.array("d")
+        costs = array.array("d")
+        starttimes = array.array("d")
+        endtimes = array.array("d")
+        statuses = array.array("b")
+        for (config_id, budget, times, result, _), _ in read_jsonlines(
+                os.path.join(base, "results.json")):
+            config_id = tuple(config_id)
+
+            cost = None
+            status = Status.CRASHED
+            if result is not None:
+                cost = result["loss"]
+
+                # QUEUED, RUNNING, CRASHED, REVIEW, TERMINATED, COMPLETED, SUCCESS
                 status = Status.SUCCESS
-            elif "RUNNING" in status or "QUEUED" in status or "REVIEW" in status:
-                status = Status.RUNNING
-            else:
-                status = Status.CRASHED
+                info = result.get("info")
+                if isinstance(info, dict) and "state" in info:
+                    status = self._get_status(info["state"])
 
-            if status != Status.SUCCESS:
+            if status != Status.SUCCESS or cost is None:
                 # We don't want cost included which are failed
-                cost = None
-
-            run.add(
-                costs=[cost],  # Having only single objective here
-                config=config,
-                budget=budget,
-                start_time=starttime,
-                end_time=endtime,
-                status=status,
-                origin=origin,
-                additional=additional,
-            )
+                cost = np.nan
+
+            trial_config_ids.append(config_id)
+            orders.append(config_order[config_id])
+            budgets.append(budget)
+            costs.append(cost)
+            starttimes.append(times["started"])
+            endtimes.append(times["finished"])
+            statuses.append(status)
+
+        order = np.argsort(np.frombuffer(orders, dtype=np.int64), kind="stable")
+
+        # Times are relative to the first started run
+        starttimes = np.frombuffer(starttimes, dtype=np.float64)[order]
+        endtimes = np.frombuffer(endtimes, dtype=np.float64)[order]
+        if len(starttimes) > 0:
+            first_starttime = starttimes.min()
+            starttimes = starttimes - first_starttime
+            endtimes = endtimes - first_starttime
+
+        run.extend(
+            costs=np.frombuffer(costs, dtype=np.float64)[order],  # Having only single objective here
+            configs=[configs[trial_config_ids[i]] for i in order.tolist()],
+            budgets=np.frombuffer(budgets, dtype=np.float64)[order],
+            start_times=starttimes,
+            end_times=endtimes,
+            statuses=np.frombuffer(statuses, dtype=np.int8)[order],
+        )
 
         # Save for sanity check
         # run.save(os.path.join(base, "run"))
 
         return run
+
+    @staticmethod
+    def _get_status(state):
+        if "SUCCESS" in state or "TERMINATED" in state or "COMPLETED" in state:
+            return Status.SUCCESS
+        elif "RUNNING" in state or "QUEUED" in state or "REVIEW" in state:
+            return Status.RUNNING
+        else:
+            return Status.CRASHED
@@ -7,12 +7,47 @@ from deepcave.runs.run import Run
 
 
 class Converter:
+    # Converted runs are stored in the run cache (see `Handler`). Converters which read
+    # DeepCAVE runs anyway don't need it.
+    cache = True
+
+    # Increase if the converted runs change, so that cached runs are converted again
+    version = 1
 
     @staticmethod
     @abstractmethod
     def name() -> str:
         raise NotImplementedError()
 
+    @staticmethod
+    def required_files() -> list:
+        """
+        Files (relative to working_dir/run_name) which every run of the converter has.
+        """
+
+        return []
+
+    def is_valid_run(self, working_dir, run_name) -> bool:
+        """
+        Cheap check whether working_dir/run_name can be converted, without converting it:
+        All required files must exist and `sniff` must accept them.
+        """
+
+        path = os.path.join(working_dir, run_name)
+        for filename in self.required_files():
+            if not os.path.isfile(os.path.join(path, filename)):
+                return False
+
+        return self.sniff(path)
+
+    def sniff(self, path) -> bool:
+        """
+        Checks the beginning of the required files (see `deepcave.utils.files.read_head`).
+        By default, the files are not checked.
+        """
+
+        return True
+
     @abstractmethod
     def get_run_id(self, working_dir, run_name) -> str:
         """
@@ -30,6 +65,23 @@ class Converter:
 
         raise NotImplementedError()
 
+    def update_run(self, run, working_dir, run_name) -> Run:
+        """
+        Called if the run id changed. By default, the run is converted again.
+        Converters which can extend the existing run in place should overwrite this method.
+        """
+
+        return self.get_run(working_dir, run_name)
+
+    def cache_run(self, working_dir, run_name, path):
+        """
+        Converts the run and saves it (with snapshot) to path, where the `Handler` loads it from.
+        Used to convert runs in other processes.
+        """
+
+        run = self.get_run(working_dir, run_name)
+        run.save(path, snapshot=True, fsync=False)
+
     def get_available_run_names(self, working_dir) -> list:
         """
         Lists the run names in working_dir.
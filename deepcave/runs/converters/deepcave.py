@@ -6,22 +6,53 @@ from typing import Dict, Type, Any
 
 from deepcave.runs.converters.converter import Converter
 from deepcave.runs.run import Run
-from deepcave.utils.hash import file_to_hash
+from deepcave.utils.files import read_head
+from deepcave.utils.hash import file_to_fingerprint, string_to_hash
 
 
 class DeepCAVE(Converter):
+    # The runs are read from disk directly
+    cache = False
+
     @staticmethod
     def name() -> str:
         return "DeepCAVE"
 
+    @staticmethod
+    def required_files() -> list:
+        return ["meta.json", "configspace.json", "configs.json", "origins.json"]
+
+    def is_valid_run(self, working_dir, run_name) -> bool:
+        # Same as `Run.exists`, but without creating the run
+        path = os.path.join(working_dir, run_name)
+        if len(Run.get_shard_paths(path)) > 0:
+            return True
+
+        return super().is_valid_run(working_dir, run_name) and (
+            os.path.isfile(os.path.join(path, "history.jsonl")) or
+            os.path.isfile(os.path.join(path, "snapshot", "header.json")))
+
+    def sniff(self, path) -> bool:
+        return read_head(os.path.join(path, "meta.json")).startswith(b"{")
+
     def get_run_id(self, working_dir, run_name) -> str:
         """
         The id from the files in the current working_dir/run_name/*. For example, history.json could be read and hashed.
         Idea behind: If id changed, then we have to update cached trials.
         """
 
-        # Use hash of history.json as id
-        return file_to_hash(os.path.join(working_dir, run_name, "history.jsonl"))
+        path = os.path.join(working_dir, run_name)
+
+        # Sharded runs change if any of the shards changes
+        shard_paths = Run.get_shard_paths(path)
+        if len(shard_paths) > 0:
+            return string_to_hash("".join(
+                os.path.basename(os.path.normpath(shard_path)) + file_to_fingerprint(os.path.join(shard_path, "history.jsonl"))
+                for shard_path in shard_paths
+            ))
+
+        # The fingerprint is memoized, so that unchanged runs are not read again
+        return file_to_fingerprint(os.path.join(path, "history.jsonl"))
 
     def get_run(self, working_dir, run_name) -> Run:
         """
@@ -29,3 +60,11 @@ class DeepCAVE(Converter):
         """
 
         return Run(path=os.path.join(working_dir, run_name))
+
+    def update_run(self, run, working_dir, run_name) -> Run:
+        """
+        Only the trials which were appended since the last load are read.
+        """
+
+        run.refresh()
+        return run
@@ -1,5 +1,5 @@
 import os
-import json
+import array
 import glob
 import pandas as pd
 import numpy as np
@@ -10,7 +10,8 @@ from deepcave.runs.run import Status
 from deepcave.runs.converters.converter import Converter
 from deepcave.runs.objective import Objective
 from deepcave.runs.run import Run
-from deepcave.utils.hash import file_to_hash
+from deepcave.utils.hash import file_to_fingerprint
+from deepcave.utils.files import read_head, iter_json_items
 
 
 class SMAC(Converter):
@@ -18,14 +19,22 @@ class SMAC(Converter):
     def name() -> str:
         return "SMAC"
 
+    @staticmethod
+    def required_files() -> list:
+        return ["configspace.json", "scenario.txt", "runhistory.json"]
+
+    def sniff(self, path) -> bool:
+        # The runhistory is an object with data, configs and config_origins
+        return read_head(os.path.join(path, "runhistory.json")).startswith(b"{")
+
     def get_run_id(self, working_dir, run_name) -> str:
         """
         The id from the files in the current working_dir/run_name/*. For example, history.json could be read and hashed.
         Idea behind: If id changed, then we have to update cached trials.
         """
 
-        # Use hash of history.json as id
-        return file_to_hash(os.path.join(working_dir, run_name, "runhistory.json"))
+        # The fingerprint is memoized, so that unchanged runs are not read again
+        return file_to_fingerprint(os.path.join(working_dir, run_name, "runhistory.json"))
 
     def get_run(self, working_dir, run_name) -> Run:
         """
@@ -76,68 +85,206 @@ class SMAC(Converter):
         )
 
         # Iterate over the runhistory
-        with open(os.path.join(base, "runhistory.json")) as json_file:
-            all_data = json.load(json_file)
-            data = all_data["data"]
-            config_origins = all_data["config_origins"]
-            configs = all_data["configs"]
+        # The runhistory is parsed incrementally and the trials are kept in compact columns,
+        # because the file can be huge. The configs are only known at the end.
+        config_ids = array.array("q")
+        instances = []
+        seeds = array.array("q")
+        budgets = array.array("d")
+        costs = array.array("d")
+        starttimes = array.array("d")
+        endtimes = array.array("d")
+        statuses = array.array("b")
+        additionals = []
+        config_origins = {}
+        configs = {}
 
-        first_starttime = None
-        seeds = []
-        for (config_id, instance_id, seed, budget), (cost, time, status, starttime, endtime, additional_info) in data:
+        for key, subkey, value in iter_json_items(os.path.join(base, "runhistory.json")):
+            if key == "configs":
+                configs[subkey] = value
+                continue
 
-            config_id = str(config_id)
-            config = configs[config_id]
+            if key == "config_origins":
+                config_origins[subkey] = value
+                continue
 
-            if seed not in seeds:
-                seeds.append(seed)
+            if key != "data":
+                continue
 
-            if len(seeds) > 1:
-                raise RuntimeError("Multiple seeds are not supported.")
+            (config_id, instance_id, seed, budget), \
+                (cost, time, status, starttime, endtime, additional_info) = value
 
-            if instance_id is not None:
-                raise RuntimeError("Instances are not supported.")
+            status = self._get_status(status["__enum__"])
+            if status != Status.SUCCESS:
+                # We don't want cost included which are failed
+                cost = None
 
-            if first_starttime is None:
-                first_starttime = starttime
+            config_ids.append(config_id)
+            instances.append("" if instance_id is None else str(instance_id))
+            seeds.append(-1 if seed is None else seed)
+            budgets.append(budget)
+            costs.append(np.nan if cost is None else cost)
+            starttimes.append(starttime)
+            endtimes.append(endtime)
+            statuses.append(status)
+            additionals.append(additional_info if additional_info else None)
 
-            starttime = starttime - first_starttime
-            endtime = endtime - first_starttime
+        # Times are relative to the first started entry (not necessarily the first in data)
+        starttimes = np.frombuffer(starttimes, dtype=np.float64)
+        endtimes = np.frombuffer(endtimes, dtype=np.float64)
+        if len(starttimes) > 0:
+            first_starttime = starttimes.min()
+            starttimes = starttimes - first_starttime
+            endtimes = endtimes - first_starttime
 
-            status = status["__enum__"]
+        columns = {
+            "config_ids": np.frombuffer(config_ids, dtype=np.int64),
+            # Round budget
+            "budgets": np.round(np.frombuffer(budgets, dtype=np.float64), 2),
+            "instances": np.array(instances, dtype=str),
+            "seeds": np.frombuffer(seeds, dtype=np.int64),
+            "costs": np.frombuffer(costs, dtype=np.float64),
+            "statuses": np.frombuffer(statuses, dtype=np.int8),
+            "start_times": starttimes,
+            "end_times": endtimes,
+        }
 
-            if "SUCCESS" in status:
-                status = Status.SUCCESS
-            elif "TIMEOUT" in status:
-                status = Status.TIMEOUT
-            elif "ABORT" in status:
-                status = Status.ABORTED
-            elif "MEMOUT" in status:
-                status = Status.MEMORYOUT
-            elif "RUNNING" in status:
-                status = Status.RUNNING
-            else:
-                status = Status.CRASHED
+        # Unsuccessful entries are penalized, so that configs which fail on hard instances
+        # don't look better than the others.
+        # Runtime is penalized with 10 times the cutoff, everything else with the worst cost.
+        if meta.get("Run Objective") == "runtime" and "Algorithm Time Limit" in meta:
+            par = 10 * float(meta["Algorithm Time Limit"])
+            aggregation = "PAR10"
+        else:
+            successful_costs = columns["costs"][columns["statuses"] == Status.SUCCESS]
+            successful_costs = successful_costs[~np.isnan(successful_costs)]
+            par = float(successful_costs.max()) if len(successful_costs) > 0 else None
+            aggregation = "Mean (failures count as worst cost)"
 
-            if status != Status.SUCCESS:
-                # We don't want cost included which are failed
-                cost = None
+        # Multiple instances or seeds are aggregated per config and budget
+        trials, first_ids = self._aggregate(columns, par)
+        aggregated = len(first_ids) < len(additionals)
+        if aggregated:
+            additionals = [{} for _ in first_ids]
+            run.meta["Aggregation"] = aggregation
+        else:
+            additionals = [additionals[id] for id in first_ids.tolist()]
+            # Single failed entries have no cost, as without aggregation
+            trials["costs"][trials["statuses"] != int(Status.SUCCESS)] = np.nan
 
-            # Round budget
-            budget = np.round(budget, 2)
-
-            run.add(
-                costs=[cost],  # Having only single objective here
-                config=config,
-                budget=budget,
-                start_time=starttime,
-                end_time=endtime,
-                status=status,
-                origin=config_origins[config_id],
-                additional=additional_info,
-            )
+        # The single costs are kept in the run
+        if aggregated or np.any(columns["instances"] != ""):
+            run.instance_table = columns
+
+        trial_config_ids = [str(config_id) for config_id in trials["config_ids"].tolist()]
+        run.extend(
+            costs=trials["costs"],  # Having only single objective here
+            configs=[configs[config_id] for config_id in trial_config_ids],
+            budgets=trials["budgets"],
+            start_times=trials["start_times"],
+            end_times=trials["end_times"],
+            statuses=trials["statuses"],
+            origins=[config_origins.get(config_id) for config_id in trial_config_ids],
+            additionals=additionals,
+        )
+
+        # The instance table should refer to the config ids of the run
+        if run.instance_table is not None:
+            config_ids = {
+                int(config_id): run.get_config_id(config) for config_id, config in configs.items()
+            }
+            run.instance_table["config_ids"] = np.array(
+                [config_ids[config_id] for config_id in run.instance_table["config_ids"].tolist()],
+                dtype=np.int64)
 
         # Save for sanity check
         # run.save(os.path.join(base, "run"))
 
         return run
+
+    @staticmethod
+    def _aggregate(columns, par=None):
+        """
+        Aggregates the entries of the same config and budget (but different instances or seeds).
+        If `par` is given, unsuccessful entries are counted with `par` (e.g. PAR10 for runtime)
+        before the costs are averaged, so trials which failed on every entry cost `par`.
+        Without `par`, only the successful entries are averaged and trials without
+        successful entries have no cost. An aggregated trial is successful if any of its
+        entries is.
+
+        Args:
+            columns (dict): Columns of the entries (config_ids, budgets, costs, statuses,
+                start_times and end_times).
+            par (float): Cost of unsuccessful entries.
+
+        Returns:
+            trials (dict): Aggregated columns, ordered by the first entry of every trial.
+            first_ids (np.ndarray): Position of the first entry of every trial.
+        """
+
+        n = len(columns["config_ids"])
+        if n == 0:
+            return columns, np.arange(0)
+
+        # Group by config and budget (in order of the first entries)
+        keys = np.column_stack([columns["config_ids"].astype(np.float64), columns["budgets"]])
+        _, first_ids, groups = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        groups = groups.reshape(-1)
+
+        # Sort the groups by their first entry
+        group_order = np.argsort(first_ids, kind="stable")
+        rank = np.empty_like(group_order)
+        rank[group_order] = np.arange(len(group_order))
+        groups = rank[groups]
+        first_ids = first_ids[group_order]
+        n_groups = len(first_ids)
+
+        success = columns["statuses"] == Status.SUCCESS
+        costs = columns["costs"]
+        if par is not None:
+            costs = np.where(success, costs, par)
+            valid = ~np.isnan(costs)
+        else:
+            valid = success & ~np.isnan(costs)
+
+        counts = np.bincount(groups, weights=valid, minlength=n_groups)
+        sums = np.bincount(groups, weights=np.where(valid, costs, 0.), minlength=n_groups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            aggregated_costs = np.where(counts > 0, sums / counts, np.nan)
+
+        # Unsuccessful trials take the status of their last entry
+        any_success = np.bincount(groups, weights=success, minlength=n_groups) > 0
+        last_ids = np.zeros(n_groups, dtype=np.int64)
+        np.maximum.at(last_ids, groups, np.arange(n))
+        statuses = np.where(any_success, int(Status.SUCCESS), columns["statuses"][last_ids])
+
+        start_times = np.full(n_groups, np.inf)
+        np.minimum.at(start_times, groups, columns["start_times"])
+        end_times = np.full(n_groups, -np.inf)
+        np.maximum.at(end_times, groups, columns["end_times"])
+
+        trials = {
+            "config_ids": columns["config_ids"][first_ids],
+            "budgets": columns["budgets"][first_ids],
+            "costs": aggregated_costs,
+            "statuses": statuses.astype(np.int8),
+            "start_times": start_times,
+            "end_times": end_times,
+        }
+
+        return trials, first_ids
+
+    @staticmethod
+    def _get_status(status):
+        if "SUCCESS" in status:
+            return Status.SUCCESS
+        elif "TIMEOUT" in status:
+            return Status.TIMEOUT
+        elif "ABORT" in status:
+            return Status.ABORTED
+        elif "MEMOUT" in status:
+            return Status.MEMORYOUT
+        elif "RUNNING" in status:
+            return Status.RUNNING
+        else:
+            return Status.CRASHED
@@ -0,0 +1,134 @@
+import numpy as np
+
+from ConfigSpace.hyperparameters import CategoricalHyperparameter, Constant, OrdinalHyperparameter, \
+    UniformFloatHyperparameter, UniformIntegerHyperparameter
+
+
+class ConfigEncoder:
+    """
+    Encodes configuration dictionaries into the same vectors as `Configuration.get_array()`,
+    without creating (and validating) a `Configuration` object for every configuration.
+
+    The transformation of every hyperparameter is compiled once per configspace by probing the
+    transformation of ConfigSpace itself. Afterwards, whole columns are encoded with numpy.
+    Inactive hyperparameters are encoded as NaN.
+    """
+
+    def __init__(self, configspace):
+        self._setup(configspace)
+
+    def __getstate__(self):
+        # The compiled encoders are closures, which can not be pickled
+        return {"configspace": self.configspace}
+
+    def __setstate__(self, state):
+        self._setup(state["configspace"])
+
+    def _setup(self, configspace):
+        self.configspace = configspace
+        self.hyperparameters = configspace.get_hyperparameters()
+        self._encoders = [self._compile(hp) for hp in self.hyperparameters]
+
+        # Values for inactive hyperparameters which are used by the random forests.
+        # Easiest case is to replace all nans with -1.
+        # However, since Stefan used different values for inactives
+        # we also have to use different inactives to be compatible
+        # with the random forests.
+        # https://github.com/automl/SMAC3/blob/a0c89502f240c1205f83983c8f7c904902ba416d/smac/epm/base_rf.py#L45
+        self._tree_impute_values = {}
+        for idx, hp in enumerate(self.hyperparameters):
+            parents = self.configspace.get_parents_of(hp.name)
+            if len(parents) == 0:
+                continue
+
+            if isinstance(hp, CategoricalHyperparameter):
+                self._tree_impute_values[idx] = len(hp.choices)
+            elif isinstance(hp, (UniformFloatHyperparameter, UniformIntegerHyperparameter)):
+                self._tree_impute_values[idx] = -1
+            elif isinstance(hp, Constant):
+                self._tree_impute_values[idx] = 1
+            else:
+                # Only a problem if the encoding is used for trees
+                self._tree_impute_values[idx] = None
+
+    def encode(self, configs):
+        """
+        Args:
+            configs (list of dict): Configurations to encode.
+
+        Returns:
+            np.ndarray: Encoded configurations of shape (n_configs, n_hyperparameters).
+        """
+
+        X = np.full((len(configs), len(self.hyperparameters)), np.nan)
+        for idx, (hp, encode) in enumerate(zip(self.hyperparameters, self._encoders)):
+            rows = []
+            values = []
+            for row, config in enumerate(configs):
+                if hp.name in config:
+                    rows.append(row)
+                    values.append(config[hp.name])
+
+            if len(rows) > 0:
+                X[rows, idx] = encode(values)
+
+        return X
+
+    def impute(self, X, for_tree=False):
+        """
+        Replaces the NaNs of inactive hyperparameters (inplace).
+
+        Args:
+            for_tree (bool): Inactives are treated differently.
+        """
+
+        if not for_tree:
+            X[np.isnan(X)] = -1
+        else:
+            for idx, value in self._tree_impute_values.items():
+                if value is None:
+                    raise ValueError
+
+                nonfinite_mask = ~np.isfinite(X[:, idx])
+                X[nonfinite_mask, idx] = value
+
+        return X
+
+    @staticmethod
+    def _compile(hp):
+        encode_value = hp._inverse_transform
+
+        if isinstance(hp, (UniformFloatHyperparameter, UniformIntegerHyperparameter)) and \
+                getattr(hp, "q", None) is None:
+            # The encoding is affine in the (log) value, so the bounds define it completely
+            transform = np.log if hp.log else (lambda x: x)
+            lower, upper = transform(float(hp.lower)), transform(float(hp.upper))
+            encoded_lower = float(encode_value(hp.lower))
+            encoded_upper = float(encode_value(hp.upper))
+            scale = (encoded_upper - encoded_lower) / (upper - lower)
+
+            def encode(values):
+                values = transform(np.array(values, dtype=np.float64))
+                return np.clip(encoded_lower + (values - lower) * scale, 0., 1.)
+
+            return encode
+
+        if isinstance(hp, (CategoricalHyperparameter, OrdinalHyperparameter, Constant)):
+            if isinstance(hp, CategoricalHyperparameter):
+                choices = hp.choices
+            elif isinstance(hp, OrdinalHyperparameter):
+                choices = hp.sequence
+            else:
+                choices = [hp.value]
+
+            mapping = {choice: float(encode_value(choice)) for choice in choices}
+
+            def encode(values):
+                return np.array([mapping[value] for value in values], dtype=np.float64)
+
+            return encode
+
+        def encode(values):
+            return np.array([encode_value(value) for value in values], dtype=np.float64)
+
+        return encode
@@ -1,19 +1,31 @@
 import os
 import json
+import shutil
 import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-from deepcave.utils.importing import auto_import_iter
+from deepcave.utils.hash import string_to_hash
+from deepcave.runs.converters import get_converters
 from deepcave.runs.converters.converter import Converter
+from deepcave.runs.run import Run
+from deepcave.config import CONFIG
 from deepcave import c, rc
 from deepcave.utils.logs import get_logger
 
 logger = get_logger(__name__)
 
+# Increase if the format of the run cache changes, so that old snapshots are not loaded anymore
+RUN_CACHE_VERSION = 1
+
 
 class Handler:
     """
     Handles the runs. Based on the meta data in the cache, automatically selects the right converter
     and switches to the right (plugin) cache.
+
+    Converted runs are stored as snapshots in CACHE_DIR/runs/, keyed by converter name and run id,
+    so that runs are only converted again if their files changed.
     """
 
     def __init__(self) -> None:
@@ -22,9 +34,15 @@ class Handler:
         self.runs = {}
         self.groups = {}
 
+        # Memoized converter of the working directory
+        self._converters = {}
+
         # Read from cache
         self.update()
 
+        # Runs of previous sessions are not needed anymore
+        self._prune_cached_runs()
+
     def update(self):
         """
         The run caches are switched here.
@@ -51,6 +69,9 @@ class Handler:
 
             rc.switch(working_dir, run_names)
 
+            # Runs which have to be loaded
+            changed = []
+
             # We also have to clear the cache here
             # because the data might be not accurate anymore.
             # This is basically called on every page.
@@ -70,20 +91,30 @@ class Handler:
                         logger.info(f"... cache was cleared.")
                         rc[run_name].clear()
 
-                    # Update the run
-                    self.runs[run_name] = self.converter.get_run(
-                        working_dir, run_name)
+                    # The old run is not needed anymore (unless another run has the same files)
+                    if old_run_id is not None and all(
+                            run_ids[name] != old_run_id for name in run_ids if name != run_name):
+                        self._remove_cached_run(old_run_id)
 
-                    logger.info(f"... run was updated.")
+                    changed.append(run_name)
 
                 # Update run ids
                 run_ids[run_name] = run_id
 
             # Really make sure all runs are set
             for run_name in run_names:
-                if run_name not in self.runs:
-                    self.runs[run_name] = self.converter.get_run(
-                        working_dir, run_name)
+                if run_name not in self.runs and run_name not in changed:
+                    changed.append(run_name)
+
+            self._convert_runs(working_dir, changed, run_ids)
+
+            # Update the runs
+            # If the run is already there, the converter might extend it in place
+            for run_name in changed:
+                self.runs[run_name] = self._get_run(
+                    working_dir, run_name, run_ids[run_name], self.runs.get(run_name))
+
+                logger.info(f"Run {run_name} was updated.")
 
             # We also have to register the ids
             self.set_run_ids(run_ids)
@@ -150,24 +181,135 @@ class Handler:
         self.update()
         return self.runs
 
-    def _get_available_converters(self):
-        available_converters = {}
+    def _get_run(self, working_dir, run_name, run_id, run=None):
+        """
+        Loads the converted run from the run cache. If it is not cached yet, the run is
+        converted and cached.
 
-        paths = [os.path.join(os.path.dirname(__file__), 'converters/*')]
-        for _, obj in auto_import_iter("converter", paths):
-            if not issubclass(obj, Converter):
-                continue
-            # Plugin itself is a subclass, filter it out
-            if obj == Converter:
+        Args:
+            run (Run): The previous version of the run, which the converter might update in place.
+        """
+
+        if not self.converter.cache:
+            if run is not None:
+                return self.converter.update_run(run, working_dir, run_name)
+
+            return self.converter.get_run(working_dir, run_name)
+
+        path = self._get_cached_run_path(run_id)
+
+        # The header of the snapshot is written last
+        if os.path.isfile(os.path.join(path, "snapshot", "header.json")):
+            try:
+                cached_run = Run(path=path)
+                # Load (and map) the data now, so that the run does not depend on the cache
+                # files anymore. Converted runs have no path.
+                cached_run.path = None
+
+                return cached_run
+            except Exception as e:
+                logger.warning(f"Cached run of {run_name} could not be loaded: {e}")
+
+        if run is not None:
+            run = self.converter.update_run(run, working_dir, run_name)
+        else:
+            run = self.converter.get_run(working_dir, run_name)
+
+        # Another process might convert the same run, but files are replaced atomically
+        original_path = run.path
+        try:
+            run.save(path, snapshot=True, fsync=False)
+        except Exception as e:
+            logger.warning(f"Run {run_name} could not be cached: {e}")
+
+        # The run should not point to the cache
+        run.path = original_path
+
+        return run
+
+    def _convert_runs(self, working_dir, run_names, run_ids):
+        """
+        Converts the runs, which are not cached yet, in parallel processes and saves them to
+        the run cache. Runs which fail here are converted (again) by `_get_run`,
+        which raises the error.
+        """
+
+        if not self.converter.cache:
+            return
+
+        # Converters which update runs in place need the previous run
+        in_place = type(self.converter).update_run is not Converter.update_run
+
+        pending = []
+        for run_name in run_names:
+            if in_place and run_name in self.runs:
                 continue
 
-            available_converters[obj.name()] = obj
+            path = self._get_cached_run_path(run_ids[run_name])
+            if not os.path.isfile(os.path.join(path, "snapshot", "header.json")):
+                pending.append((run_name, path))
+
+        processes = CONFIG["LOAD_PROCESSES"]
+        if processes is None:
+            processes = os.cpu_count() or 1
+
+        processes = min(processes, len(pending))
+        if processes <= 1:
+            return
+
+        # Forking the (multithreaded) server could copy held locks, so the processes are spawned
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+            futures = {
+                executor.submit(self.converter.cache_run, working_dir, run_name, path): run_name
+                for run_name, path in pending
+            }
+
+            for future, run_name in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"Run {run_name} could not be converted in parallel: {e}")
+
+    def _get_cached_run_path(self, run_id):
+        key = f"{RUN_CACHE_VERSION}-{self.converter.name()}-{self.converter.version}-{run_id}"
+        return os.path.join(CONFIG["CACHE_DIR"], "runs", string_to_hash(key))
+
+    def _prune_cached_runs(self):
+        """
+        Removes the cached runs, which don't belong to the selected runs. These are left over
+        from previous sessions, other working directories or older versions.
+        """
+
+        cache_dir = os.path.join(CONFIG["CACHE_DIR"], "runs")
+        if not os.path.isdir(cache_dir):
+            return
 
-        return available_converters
+        keep = set()
+        if self.converter is not None and self.converter.cache:
+            for run_id in self.run_ids.values():
+                if run_id is not None:
+                    keep.add(os.path.basename(self._get_cached_run_path(run_id)))
+
+        for name in os.listdir(cache_dir):
+            if name not in keep:
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+    def _remove_cached_run(self, run_id):
+        if self.converter is None or not self.converter.cache:
+            return
+
+        shutil.rmtree(self._get_cached_run_path(run_id), ignore_errors=True)
+
+    def _get_available_converters(self):
+        # The registry is only built once per process
+        return get_converters()
 
     def _find_compatible_converter(self, working_dir):
         """
         All directories must be valid. Otherwise, DeepCAVE does not recognize it as compatible directory.
+        The first directory decides, which is checked with the (cheap) `Converter.is_valid_run`.
+        The result is memoized until the working directory or its first directory changes.
         """
 
         if working_dir is None or not os.path.isdir(working_dir):
@@ -180,25 +322,31 @@ class Handler:
         if len(run_names) == 0:
             return None
 
+        run_names = [name for name in run_names if name != ".DS_Store"]
+        run_name = run_names[0] if len(run_names) > 0 else None
+
+        try:
+            key = (working_dir, os.stat(working_dir).st_mtime_ns, run_name)
+            if run_name is not None:
+                key += (os.stat(os.path.join(working_dir, run_name)).st_mtime_ns, )
+        except OSError:
+            return None
+
+        if key in self._converters:
+            return self._converters[key]
+
+        compatible_converter = None
         for obj in self._get_available_converters().values():
             converter = obj()
 
-            works = True
-            for run_name in run_names:
-                if run_name == ".DS_Store":
-                    continue
-
-                try:
-                    converter.get_run(working_dir, run_name)
-                    return converter
-                except:
-                    works = False
-                    break
+            # Only a .DS_Store
+            if run_name is None or converter.is_valid_run(working_dir, run_name):
+                compatible_converter = converter
+                break
 
-            if works:
-                return converter
+        self._converters = {key: compatible_converter}
 
-        return None
+        return compatible_converter
 
     def _get_json_content(self, filename):
         filename = os.path.join(filename)
@@ -208,6 +356,12 @@ class Handler:
         return data
 
 
-handler = Handler()
+# The processes which convert runs (see `Handler._convert_runs`) are spawned and import the
+# server again. They must not load (and convert) the selected runs themselves.
+# Their name is already set while they import the server (unlike `parent_process`).
+if multiprocessing.current_process().name == "MainProcess":
+    handler = Handler()
+else:
+    handler = None
 
 __all__ = [handler]
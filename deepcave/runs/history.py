@@ -0,0 +1,452 @@
+import numpy as np
+
+from deepcave.runs.trial import Trial
+from deepcave.utils.resources import RESOURCES
+
+
+class History:
+    """
+    Columnar store of the trials of a run. Every field is kept in its own (growing) numpy array
+    and `Trial` objects are only created if a trial is accessed.
+
+    Missing budgets, costs and resources (None) are stored as NaN. The original values of the
+    budgets (e.g. ints) are remembered, so that trials return them unchanged.
+
+    Trials are found by their key (config id and budget) with `find` and filtered with `select`.
+    The key of a trial must not change if it is overwritten.
+    """
+
+    # Names of the array columns, which are also used as filenames for snapshots
+    columns = [
+        "config_ids", "budgets", "costs", "start_times", "end_times", "statuses", "resources"
+    ]
+
+    def __init__(self, capacity=64):
+        self._size = 0
+        self._capacity = capacity
+
+        self._config_ids = np.empty(capacity, dtype=np.int64)
+        self._budgets = np.empty(capacity, dtype=np.float64)
+        self._start_times = np.empty(capacity, dtype=np.float64)
+        self._end_times = np.empty(capacity, dtype=np.float64)
+        self._statuses = np.empty(capacity, dtype=np.int8)
+        self._resources = np.empty((capacity, len(RESOURCES)), dtype=np.float64)
+
+        # The number of objectives is known with the first trial
+        self._costs = None
+
+        # Free-form data can not be stored in arrays. Empty dicts are stored as None.
+        self._additionals = []
+
+        self._budget_values = {}
+        self._reset_index()
+
+    @classmethod
+    def from_columns(cls, additionals, **columns):
+        """
+        Creates the history from existing columns (e.g. memory-mapped arrays) without copying them.
+        Read-only columns are only copied once the history is changed.
+
+        Args:
+            additionals (list): Additional data per trial. None for empty dicts.
+            columns (np.ndarray): Arrays of all columns in `History.columns`.
+        """
+
+        history = cls.__new__(cls)
+        history._size = len(additionals)
+        history._capacity = len(additionals)
+        history._additionals = list(additionals)
+        history._budget_values = {}
+        history._reset_index()
+
+        for name in cls.columns:
+            setattr(history, "_" + name, columns[name])
+
+        return history
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        columns = zip(
+            self.config_ids.tolist(),
+            self.budgets.tolist(),
+            self.costs.tolist(),
+            self.start_times.tolist(),
+            self.end_times.tolist(),
+            self.statuses.tolist(),
+            self._additionals,
+            self.resources.tolist()
+        )
+
+        for config_id, budget, costs, start_time, end_time, status, additional, resources \
+                in columns:
+            yield self._create_trial(
+                config_id, budget, costs, start_time, end_time, status, additional, resources)
+
+    def __getitem__(self, id):
+        if isinstance(id, slice):
+            return [self[i] for i in range(*id.indices(self._size))]
+
+        id = self._check_id(id)
+
+        return self._create_trial(
+            int(self._config_ids[id]),
+            float(self._budgets[id]),
+            self._costs[id].tolist(),
+            float(self._start_times[id]),
+            float(self._end_times[id]),
+            int(self._statuses[id]),
+            self._additionals[id],
+            self._resources[id].tolist()
+        )
+
+    def __setitem__(self, id, trial):
+        id = self._check_id(id)
+
+        # E.g. memory-mapped columns
+        if not self._config_ids.flags.writeable:
+            self._grow(self._capacity)
+
+        self._set(id, trial)
+
+    def append(self, trial):
+        if self._costs is None:
+            self._costs = np.empty((self._capacity, len(trial.costs)), dtype=np.float64)
+
+        if self._size == self._capacity:
+            self._grow(max(2 * self._capacity, 64))
+
+        # Appended trials are indexed separately until there are enough of them
+        if self._is_indexed():
+            self._recent_keys[(trial.config_id, self._get_budget_key(trial.budget))] = self._size
+
+        self._additionals.append(None)
+        self._set(self._size, trial)
+        self._size += 1
+
+        if len(self._recent_keys) > max(1024, self._indexed // 4):
+            self._update_index()
+
+    def extend(self, additionals, **columns):
+        """
+        Appends many trials at once.
+
+        Args:
+            additionals (list): Additional data per trial. None for empty dicts.
+            columns (np.ndarray): Arrays of all columns in `History.columns`.
+                Missing budgets and costs are NaN.
+        """
+
+        n = len(additionals)
+        if self._costs is None:
+            self._costs = np.empty((self._capacity, columns["costs"].shape[1]), dtype=np.float64)
+
+        if self._size + n > self._capacity or not self._config_ids.flags.writeable:
+            self._grow(max(2 * self._capacity, self._size + n, 64))
+
+        for name in self.columns:
+            getattr(self, "_" + name)[self._size:self._size + n] = columns[name]
+
+        budgets = columns["budgets"]
+        for budget in np.unique(budgets[~np.isnan(budgets)]).tolist():
+            self._budget_values.setdefault(budget, budget)
+
+        self._additionals += [additional if additional else None for additional in additionals]
+        self._size += n
+
+        # Indexed again on the next lookup
+        self._reset_index()
+
+    def add_budgets(self, budgets):
+        """
+        Remembers the original values of the budgets, e.g. for columns which were loaded
+        from a snapshot.
+        """
+
+        for budget in budgets:
+            if budget is not None:
+                self._budget_values.setdefault(float(budget), budget)
+
+    def find(self, config_id, budget):
+        """
+        Returns the position of the trial with the key (config_id, budget), or None.
+        """
+
+        if not self._is_indexed():
+            self._update_index()
+
+        key = (config_id, self._get_budget_key(budget))
+        id = self._recent_keys.get(key)
+        if id is not None:
+            return id
+
+        # Configs have only a few trials (one per budget)
+        config_ids = self._sorted_keys["config_id"]
+        start = int(config_ids.searchsorted(config_id))
+        end = int(config_ids.searchsorted(config_id, side="right"))
+        for pos, budget in enumerate(self._sorted_keys["budget"][start:end].tolist(), start):
+            if budget == key[1]:
+                return int(self._sorted_ids[pos])
+
+        return None
+
+    def find_many(self, keys):
+        """
+        Args:
+            keys (np.ndarray): Keys created by `get_keys`.
+
+        Returns:
+            np.ndarray: Positions of the trials with the keys. -1 if there is no such trial.
+        """
+
+        # All keys are in the sorted arrays afterwards
+        if not self._is_indexed() or len(self._recent_keys) > 0:
+            self._update_index()
+
+        ids = np.full(len(keys), -1, dtype=np.int64)
+        if len(self._sorted_keys) == 0:
+            return ids
+
+        pos = np.minimum(np.searchsorted(self._sorted_keys, keys), len(self._sorted_keys) - 1)
+        found = self._sorted_keys[pos] == keys
+        ids[found] = self._sorted_ids[pos[found]]
+
+        return ids
+
+    def select(self, budgets=None, statuses=None, config_ids=None):
+        """
+        Returns the (sorted) positions of the trials which match all given filters.
+        Config ids and budgets are looked up in the sorted indexes, so that only the matching
+        trials are touched. Statuses are checked on these trials (or on all trials if only
+        statuses are given).
+
+        Args:
+            budgets (list): Allowed budgets (None for missing budgets). None allows all budgets.
+            statuses (list of Status): Allowed statuses. None allows all statuses.
+            config_ids (list of int): Allowed config ids. None allows all config ids.
+
+        Returns:
+            np.ndarray: Positions of the trials.
+        """
+
+        if budgets is not None:
+            budgets = np.array([self._get_budget_key(budget) for budget in budgets], dtype=np.float64)
+        if config_ids is not None:
+            config_ids = np.array(list(config_ids), dtype=np.int64)
+
+        # Configs have only a few trials, so their index is preferred
+        if config_ids is not None:
+            ids = self._select_config_ids(config_ids)
+            if budgets is not None:
+                ids = ids[np.isin(self._get_budget_keys(self._budgets[ids]), budgets)]
+        elif budgets is not None:
+            ids = self._select_budgets(budgets)
+        else:
+            ids = np.arange(self._size)
+
+        if statuses is not None:
+            ids = ids[np.isin(self._statuses[ids], [int(status) for status in statuses])]
+
+        return ids
+
+    # Keys of the trials. Missing budgets (NaN) are -inf, so that keys can be compared.
+    key_dtype = np.dtype([("config_id", np.int64), ("budget", np.float64)])
+
+    @classmethod
+    def get_keys(cls, config_ids, budgets):
+        """
+        Creates the keys of trials, e.g. for `find_many`.
+
+        Args:
+            config_ids (np.ndarray): Config ids of the trials.
+            budgets (np.ndarray): Budgets of the trials. NaN for missing budgets.
+
+        Returns:
+            np.ndarray: Keys with dtype `key_dtype`.
+        """
+
+        keys = np.empty(len(config_ids), dtype=cls.key_dtype)
+        keys["config_id"] = config_ids
+        keys["budget"] = cls._get_budget_keys(budgets)
+
+        return keys
+
+    @property
+    def additionals(self):
+        """
+        Additional data per trial. None is used for empty dicts.
+        """
+
+        return self._additionals
+
+    def get_budget(self, id):
+        """
+        Returns the budget of the trial without creating the trial.
+        """
+
+        budget = float(self._budgets[id])
+        if np.isnan(budget):
+            return None
+
+        return self._budget_values.get(budget, budget)
+
+    @property
+    def config_ids(self):
+        return self._config_ids[:self._size]
+
+    @property
+    def budgets(self):
+        return self._budgets[:self._size]
+
+    @property
+    def costs(self):
+        if self._costs is None:
+            return np.empty((0, 0), dtype=np.float64)
+
+        return self._costs[:self._size]
+
+    @property
+    def start_times(self):
+        return self._start_times[:self._size]
+
+    @property
+    def end_times(self):
+        return self._end_times[:self._size]
+
+    @property
+    def statuses(self):
+        return self._statuses[:self._size]
+
+    @property
+    def resources(self):
+        return self._resources[:self._size]
+
+    def _check_id(self, id):
+        if id < 0:
+            id += self._size
+
+        if id < 0 or id >= self._size:
+            raise IndexError("Trial index out of range.")
+
+        return id
+
+    def _reset_index(self):
+        # Positions of the trials sorted by key, which cover the first `_indexed` trials.
+        # Trials appended afterwards are in `_recent_keys` ({(config_id, budget): id}).
+        self._sorted_keys = np.empty(0, dtype=self.key_dtype)
+        self._sorted_ids = np.empty(0, dtype=np.int64)
+        self._indexed = 0
+        self._recent_keys = {}
+
+        # Positions of the trials sorted by budget, which cover the first `_budgets_indexed`
+        # trials. Trials appended afterwards are checked directly.
+        self._sorted_budgets = np.empty(0, dtype=np.float64)
+        self._budget_ids = np.empty(0, dtype=np.int64)
+        self._budgets_indexed = 0
+
+    def _is_indexed(self):
+        return self._indexed + len(self._recent_keys) == self._size
+
+    def _update_index(self):
+        keys = self.get_keys(self.config_ids, self.budgets)
+        self._sorted_ids = np.lexsort((keys["budget"], keys["config_id"]))
+        self._sorted_keys = keys[self._sorted_ids]
+        self._indexed = self._size
+        self._recent_keys = {}
+
+    def _select_config_ids(self, config_ids):
+        if not self._is_indexed():
+            self._update_index()
+
+        sorted_config_ids = self._sorted_keys["config_id"]
+        starts = sorted_config_ids.searchsorted(config_ids)
+        ends = sorted_config_ids.searchsorted(config_ids, side="right")
+        ids = [self._sorted_ids[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+        # Appended after the index was built
+        recent_ids = np.arange(self._indexed, self._size)
+        ids.append(recent_ids[np.isin(self._config_ids[recent_ids], config_ids)])
+
+        return np.sort(np.concatenate(ids))
+
+    def _select_budgets(self, budgets):
+        if self._size - self._budgets_indexed > max(1024, self._budgets_indexed // 4):
+            keys = self._get_budget_keys(self.budgets)
+            self._budget_ids = np.argsort(keys, kind="stable")
+            self._sorted_budgets = keys[self._budget_ids]
+            self._budgets_indexed = self._size
+
+        starts = self._sorted_budgets.searchsorted(budgets)
+        ends = self._sorted_budgets.searchsorted(budgets, side="right")
+        ids = [self._budget_ids[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+        # Appended after the index was built
+        recent_ids = np.arange(self._budgets_indexed, self._size)
+        ids.append(recent_ids[np.isin(self._get_budget_keys(self._budgets[recent_ids]), budgets)])
+
+        return np.sort(np.concatenate(ids))
+
+    @staticmethod
+    def _get_budget_keys(budgets):
+        budgets = np.array(budgets, dtype=np.float64)
+        budgets[np.isnan(budgets)] = -np.inf
+
+        return budgets
+
+    @staticmethod
+    def _get_budget_key(budget):
+        if budget is None or budget != budget:
+            return -np.inf
+
+        return float(budget)
+
+    def _set(self, id, trial):
+        self._config_ids[id] = trial.config_id
+        self._budgets[id] = np.nan if trial.budget is None else trial.budget
+        if trial.budget is not None:
+            self._budget_values.setdefault(float(trial.budget), trial.budget)
+        self._costs[id] = [np.nan if cost is None else cost for cost in trial.costs]
+        self._start_times[id] = trial.start_time
+        self._end_times[id] = trial.end_time
+        self._statuses[id] = trial.status
+        self._additionals[id] = trial.additional if trial.additional else None
+
+        resources = trial.resources
+        if resources is None:
+            self._resources[id] = np.nan
+        else:
+            self._resources[id] = [np.nan if value is None else value for value in resources]
+
+    def _grow(self, capacity):
+        def grow(array):
+            new_array = np.empty((capacity, ) + array.shape[1:], dtype=array.dtype)
+            new_array[:self._size] = array[:self._size]
+
+            return new_array
+
+        for name in self.columns:
+            setattr(self, "_" + name, grow(getattr(self, "_" + name)))
+
+        self._capacity = capacity
+
+    def _create_trial(self, config_id, budget, costs, start_time, end_time, status, additional,
+                      resources):
+        if budget != budget:
+            budget = None
+        else:
+            budget = self._budget_values.get(budget, budget)
+
+        costs = [None if cost != cost else cost for cost in costs]
+
+        if additional is None:
+            additional = {}
+
+        # Not measured at all
+        if all(value != value for value in resources):
+            resources = None
+        else:
+            resources = [None if value != value else value for value in resources]
+
+        return Trial(config_id, budget, costs, start_time, end_time, status, additional,
+                     resources)
@@ -1,10 +1,20 @@
 
 import glob
 import os
+import socket
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import time
 from deepcave.runs.run import Status, Run
 from deepcave.utils.files import make_dirs
+from deepcave.utils.resources import ResourceSampler
+
+
+# Markers for the writer thread
+_FLUSH = object()
+_STOP = object()
 
 
 class Recorder:
@@ -14,7 +24,17 @@ class Recorder:
                  meta={},
                  save_path="logs",
                  prefix="run",
-                 overwrite=False):
+                 overwrite=False,
+                 shard=False,
+                 asynchronous=False,
+                 flush_interval=1.,
+                 flush_size=100,
+                 max_pending=1000,
+                 max_models_size=None,
+                 keep_last_models=10,
+                 sample_resources=False,
+                 sample_interval=0.1,
+                 fsync=False):
         """
         All objectives follow the scheme the lower the better.
         If file
@@ -25,17 +45,49 @@ class Recorder:
             objectives (list of Objective):
             prefix: Name of the trial. If not given, trial_x will be used.
             overwrite: Uses the prefix as name and overwrites the file.
+            shard (bool): For recording from multiple processes (or hosts). All processes use
+                the prefix as name and every process writes to its own shard
+                (shards/<host>-<pid>/) in the run. The shards are merged when the run is loaded.
+            asynchronous (bool): Finished trials are saved by a background thread, so that `end`
+                returns immediately. Use `flush` (or the context manager) to make sure everything
+                is saved.
+            flush_interval (float): Seconds after which pending trials are saved (asynchronous only).
+            flush_size (int): Number of pending trials which are saved at once (asynchronous only).
+            max_pending (int): If that many trials are pending, `end` blocks until the
+                background thread caught up (asynchronous only).
+            max_models_size (int): Maximum size of all saved models in bytes. If exceeded, the
+                oldest models are removed, except the incumbents and the last `keep_last_models`.
+                Use None for no limit.
+            keep_last_models (int): Number of recently saved models which are never removed.
+            sample_resources (bool): Measures peak memory, cpu time and wall time of this process
+                between `start` and `end` of every trial.
+            sample_interval (float): Seconds between two memory samples.
+            fsync (bool): Sync the files to disk whenever trials are saved. Otherwise, they are
+                only synced by `flush` and `close`, which is much faster on network filesystems.
         """
 
-        self._set_path(save_path, prefix, overwrite)
+        # Processes can not agree on a new id
+        self._set_path(save_path, prefix, overwrite or shard)
 
         # Set variables
         self.last_trial_id = None
+        self.last_trial_steps = None
         self.start_time = time.time()
+
+        self.shard_path = None
+        if shard:
+            self.shard_path = os.path.join(
+                self.path, "shards", f"{socket.gethostname()}-{os.getpid()}")
+
+            # Needed to merge the times of the shards
+            meta = dict(meta)
+            meta["start_time"] = self.start_time
+
         self.start_times = {}
         self.models = {}
         self.origins = {}
         self.additionals = {}
+        self.steps = {}
 
         # Define trials container
         self.run = Run(
@@ -44,11 +96,172 @@ class Recorder:
             meta=meta
         )
 
+        # Background writer
+        self.asynchronous = asynchronous
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._error = None
+        self._thread = None
+
+        # Models are pickled in the background as well
+        self.max_models_size = max_models_size
+        self.keep_last_models = keep_last_models
+        self._model_executor = ThreadPoolExecutor(max_workers=1)
+        self._model_future = None
+
+        self._sampler = None
+        if sample_resources:
+            self._sampler = ResourceSampler(sample_interval)
+
+        if asynchronous:
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(target=self._write, daemon=True)
+            self._thread.start()
+
     def __enter__(self):
         return self
 
     def __exit__(self, type, value, traceback):
-        pass
+        self.close()
+
+    def flush(self):
+        """
+        Blocks until all finished trials are saved.
+        """
+
+        if self._thread is not None:
+            self._queue.put(_FLUSH)
+            self._queue.join()
+
+        self._raise_error()
+
+        with self._lock:
+            self._wait_for_model()
+            self._sync_run()
+
+    def close(self):
+        """
+        Saves all finished trials and stops the background thread.
+        """
+
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+        if self._sampler is not None:
+            self._sampler.close()
+
+        self._raise_error()
+
+        with self._lock:
+            self._wait_for_model()
+            self._sync_run()
+        self._model_executor.shutdown()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Could not save the trials.") from error
+
+    def _write(self):
+        """
+        Runs in the background thread: Collects finished trials and saves them in batches.
+        """
+
+        pending = []
+        last_flush = time.time()
+        while True:
+            timeout = max(0., self.flush_interval - (time.time() - last_flush))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not _FLUSH and item is not _STOP:
+                pending.append(item)
+
+            if item is _FLUSH or item is _STOP or len(pending) >= self.flush_size or \
+                    time.time() - last_flush >= self.flush_interval:
+                if len(pending) > 0:
+                    try:
+                        self._save(pending)
+                    except Exception as e:
+                        self._error = e
+
+                # Items are only done if they are saved
+                for _ in range(len(pending)):
+                    self._queue.task_done()
+
+                pending = []
+                last_flush = time.time()
+
+            # The markers are done directly
+            if item is _FLUSH or item is _STOP:
+                self._queue.task_done()
+
+            if item is _STOP:
+                break
+
+    def _save(self, trials):
+        with self._lock:
+            steps = [trial.pop("steps") for trial in trials]
+            # The run should not keep the models in memory
+            models = [trial.pop("model") for trial in trials]
+            for trial in trials:
+                self.run.add(**trial)
+
+            # And save the results
+            self._save_run()
+
+            # The steps are appended to the curve store
+            for trial, trial_steps in zip(trials, steps):
+                if len(trial_steps) == 0:
+                    continue
+
+                self.run.write_steps(
+                    self.run.get_config_id(trial["config"]),
+                    trial["budget"],
+                    [step for step, _ in trial_steps],
+                    [values for _, values in trial_steps]
+                )
+
+            for trial, model in zip(trials, models):
+                if model is None:
+                    continue
+
+                # At most one model is pending, so that models don't pile up in memory
+                self._wait_for_model()
+                self._model_future = self._model_executor.submit(
+                    self.run.save_model,
+                    self.run.get_config_id(trial["config"]),
+                    trial["budget"],
+                    model
+                )
+
+    def _save_run(self):
+        # Only the new trials (and configs) are appended to the files
+        if self.shard_path is not None:
+            self.run.save(self.shard_path, journal=True, fsync=self.fsync)
+        else:
+            self.run.save(self.path, journal=True, fsync=self.fsync)
+
+    def _sync_run(self):
+        # Only needed if the run was saved (without sync) before
+        if not self.fsync and self.run.path is not None:
+            self.run.sync()
+
+    def _wait_for_model(self):
+        if self._model_future is not None:
+            future, self._model_future = self._model_future, None
+            future.result()
+
+            # Evicted here (with the lock) instead of in the model thread, because the
+            # incumbents are read from the history
+            if self.max_models_size is not None:
+                self.run.evict_models(self.max_models_size, self.keep_last_models)
 
     def _set_path(self, path, prefix="run", overwrite=False):
         """
@@ -96,8 +309,78 @@ class Recorder:
         self.models[id] = model
         self.origins[id] = origin
         self.additionals[id] = additional
+        self.steps[id] = []
+
+        if self._sampler is not None:
+            self._sampler.start(id)
 
         self.last_trial_id = id
+        # Hashing configs is expensive and steps are logged often
+        self.last_trial_steps = self.steps[id]
+
+    def log_step(self,
+                 step,
+                 values,
+                 config=None,
+                 budget=None):
+        """
+        Logs intermediate results (e.g. the costs after every epoch) of a started trial.
+        The steps are written to the binary curve store of the run when the trial ends
+        and can be read with `Run.get_curve`.
+
+        Args:
+            step (float): Step (e.g. epoch) of the results.
+            values (float or list of floats): One value per objective.
+            config: In case of multi-processing, config+budget should be passed.
+            budget (float): See config.
+        """
+
+        if config is not None:
+            steps = self.steps[(config, budget)]
+        else:
+            steps = self.last_trial_steps
+
+        if not isinstance(values, list):
+            values = [values]
+
+        steps.append((step, values))
+
+    def add_many(self,
+                 configs,
+                 costs,
+                 budgets=np.inf,
+                 start_times=None,
+                 end_times=None,
+                 statuses=Status.SUCCESS,
+                 origins=None,
+                 additionals=None):
+        """
+        Adds many finished trials at once (e.g. to import the history of an optimizer)
+        and saves them with a single write. See `Run.extend` for the arguments.
+        If no times are given, the current time is used.
+        """
+
+        if start_times is None:
+            start_times = time.time() - self.start_time
+        if end_times is None:
+            end_times = time.time() - self.start_time
+
+        # Trials which are still pending are saved first
+        self.flush()
+
+        with self._lock:
+            self.run.extend(
+                costs,
+                configs,
+                budgets=budgets,
+                start_times=start_times,
+                end_times=end_times,
+                statuses=statuses,
+                origins=origins,
+                additionals=additionals
+            )
+
+            self._save_run()
 
     def end(self,
             costs=np.inf,
@@ -105,10 +388,12 @@ class Recorder:
             config=None,
             budget=np.inf,
             additional={},
-            end_time=None):
+            end_time=None,
+            model=None):
         """
         In case of multi-processing, config+budget should be passed as otherwise
         it can't be matched correctly.
+        If a model is given (here or in `start`), it is saved in the background.
         """
 
         if config is not None:
@@ -117,7 +402,9 @@ class Recorder:
             id = self.last_trial_id
             config, budget = id[0], id[1]
 
-        model = self.models[id]
+        if model is None:
+            model = self.models[id]
+
         start_additional = self.additionals[id].copy()
         start_additional.update(additional)
         start_time = self.start_times[id]
@@ -125,8 +412,11 @@ class Recorder:
         if end_time is None:
             end_time = time.time() - self.start_time
 
-        # Add to trial history
-        self.run.add(
+        resources = None
+        if self._sampler is not None:
+            resources = self._sampler.stop(id)
+
+        trial = dict(
             costs=costs,
             config=config,
             budget=budget,
@@ -134,7 +424,9 @@ class Recorder:
             end_time=end_time,
             status=status,
             model=model,
-            additional=start_additional
+            additional=start_additional,
+            resources=resources,
+            steps=self.steps[id]
         )
 
         # Clean the dicts
@@ -142,6 +434,13 @@ class Recorder:
         del self.models[id]
         del self.origins[id]
         del self.additionals[id]
+        del self.steps[id]
 
-        # And save the results
-        self.run.save(self.path)
+        if self.asynchronous:
+            self._raise_error()
+
+            # Blocks if the background thread falls behind
+            self._queue.put(trial)
+        else:
+            # Add to trial history and save the results
+            self._save([trial])
@@ -1,30 +1,29 @@
 import os
+import time
+import glob
+import pickle
+import threading
 import numpy as np
 import jsonlines
-from enum import IntEnum
 import pandas as pd
 import json
 
 from ConfigSpace.configuration_space import Configuration
 from ConfigSpace.read_and_write import json as cs_json
-from ConfigSpace.hyperparameters import CategoricalHyperparameter, Constant, UniformFloatHyperparameter, UniformIntegerHyperparameter
 
 from deepcave.runs.objective import Objective
-from deepcave.utils.files import make_dirs
+from deepcave.runs.trial import Status, Trial
+from deepcave.runs.history import History
+from deepcave.runs.encoder import ConfigEncoder
+from deepcave.utils.data_structures import LRUCache
+from deepcave.utils.files import AtomicWriter, make_dirs, read_jsonlines, sync_files
+from deepcave.utils.hash import config_to_hash
+from deepcave.utils.resources import RESOURCES
 from deepcave.utils.logs import get_logger
 
 logger = get_logger(__name__)
 
 
-class Status(IntEnum):
-    SUCCESS = 1
-    TIMEOUT = 2
-    MEMORYOUT = 3
-    CRASHED = 4
-    ABORTED = 5
-    RUNNING = 6
-
-
 class Run:
     """
     Creates
@@ -33,7 +32,17 @@ class Run:
     - configs.json
     - history.jsonl
     - origins.json
-    - models/1.blub
+    - instances.npz (optional)
+    - curves.bin
+    - models/<config_id>_<budget>.pkl
+
+    If the run is saved with `journal=True`, new configs and origins are appended to
+    configs_delta.jsonl and origins_delta.jsonl instead.
+    If the run is saved with `snapshot=True`, the history is also written as binary
+    snapshot (snapshot/*.npy and snapshot/header.json), which is memory-mapped when loading.
+
+    Runs which are recorded by multiple processes consist of shards
+    (shards/<host>-<pid>/, each a run itself). The shards are merged when loading.
     """
 
     def __init__(self,
@@ -49,6 +58,12 @@ class Run:
             meta (dict): Could be `ram`, `cores`, ...
         """
 
+        # Increased whenever trials are added or loaded
+        self.version = 0
+
+        # Threads (e.g. of the server) must not load the data at the same time
+        self._load_lock = threading.RLock()
+
         self.reset()
         self.configspace = configspace
         self.path = path
@@ -72,14 +87,72 @@ class Run:
         self.meta.update(meta)
 
     def reset(self):
+        self.version += 1
         self.meta = {}
         self.configspace = None
+        self.models = {}
+
+        # Compiled encoder of the configspace and the encoded configs
+        self._encoder = None
+        self._encoded_configs = None
+
+        # Results of get_encoded_configs, keyed by version and arguments
+        self._encoded_cache = LRUCache(maxsize=16)
+
+        # Bookkeeping for journaled saving: What was already written to which path.
+        self._saved_path = None
+        self._saved_trials = 0
+        self._saved_configs = 0
+        self._modified_trials = set()  # Saved trials which were overwritten
+        self._meta_changed = True
+
+        # Bookkeeping for loading: How much of the files was read already.
+        self._offsets = {}  # {filename: byte offset}
+        self._configs_stat = None
+        self._shards = None  # Runs of the shards until they are merged
+
+        # Paths of the shards with the mappings of their config ids (sharded runs only),
+        # and the loaded curves with their index
+        self._shard_sources = None
+        self._curves = None
+
+        self._reset_data()
+
+    # Attributes which are set by `_reset_data` and are loaded on first access
+    _data_attributes = [
+        "configs", "config_ids", "origins", "history", "instance_table"
+    ]
+
+    def _reset_data(self):
         self.configs = {}
+        self.config_ids = {}  # {config_hash: config_id}
         self.origins = {}
-        self.models = {}
 
-        self.history = []
-        self.trial_keys = {}
+        # Trials are found by their keys and filtered by the columns of the history
+        self.history = History()
+
+        # Costs per instance and seed, if the trials are aggregated from them.
+        # Columns (np.ndarray) are `INSTANCE_COLUMNS`.
+        self.instance_table = None
+
+    # Columns of the instance table
+    INSTANCE_COLUMNS = [
+        "config_ids", "budgets", "instances", "seeds", "costs", "statuses", "start_times", "end_times"
+    ]
+
+    def __getattr__(self, name):
+        """
+        Only called if the attribute was not found. If the run was loaded, this is the case
+        for configs, origins and history until they are accessed the first time.
+        """
+
+        if name in Run._data_attributes and "_path" in self.__dict__:
+            self._load_lazy_data()
+            if name in self.__dict__:
+                return self.__dict__[name]
+
+        raise AttributeError(
+            f"'{self.__class__.__name__}' object has no attribute '{name}'")
 
     @property
     def path(self):
@@ -89,15 +162,19 @@ class Run:
     def path(self, value):
         """
         If path is changed, also change the filenames of all created files.
+        Data which was not loaded yet is loaded from the old path first.
         """
 
+        if value is not None and value[-1] != "/":
+            value += "/"
+
+        if value != self.__dict__.get("_path"):
+            self._load_lazy_data()
+
         if value is None:
             self._path = None
             return
 
-        if value[-1] != "/":
-            value += "/"
-
         make_dirs(value)
         self._path = value
 
@@ -105,17 +182,42 @@ class Run:
         self.configspace_fn = os.path.join(value, "configspace.json")
         self.configs_fn = os.path.join(value, "configs.json")
         self.origins_fn = os.path.join(value, "origins.json")
+        self.instances_fn = os.path.join(value, "instances.npz")
         self.history_fn = os.path.join(value, "history.jsonl")
+        self.curves_fn = os.path.join(value, "curves.bin")
+        self.models_dir = os.path.join(value, "models")
+        self.configs_delta_fn = os.path.join(value, "configs_delta.jsonl")
+        self.origins_delta_fn = os.path.join(value, "origins_delta.jsonl")
+        self.snapshot_dir = os.path.join(value, "snapshot")
+        self.snapshot_fn = os.path.join(self.snapshot_dir, "header.json")
+        self.shards_dir = os.path.join(value, "shards")
+
+    @staticmethod
+    def get_shard_paths(path):
+        """
+        Returns the (sorted) paths of the shards of a run. Only shards with history are considered.
+
+        Args:
+            path (str): Path of the run.
+        """
+
+        return sorted(
+            shard_path for shard_path in glob.glob(os.path.join(path, "shards", "*", ""))
+            if os.path.isfile(os.path.join(shard_path, "history.jsonl"))
+        )
 
     def exists(self):
         if self._path is None:
             return False
 
+        if len(self.get_shard_paths(self._path)) > 0:
+            return True
+
         return os.path.isfile(self.meta_fn) and \
             os.path.isfile(self.configspace_fn) and \
             os.path.isfile(self.configs_fn) and \
             os.path.isfile(self.origins_fn) and \
-            os.path.isfile(self.history_fn)
+            (os.path.isfile(self.history_fn) or os.path.isfile(self.snapshot_fn))
 
     def add(self,
             costs,
@@ -126,7 +228,8 @@ class Run:
             status=Status.SUCCESS,
             origin=None,
             model=None,
-            additional={}):
+            additional={},
+            resources=None):
         """
 
         If combination of config and budget already exists, it will be overwritten.
@@ -136,6 +239,8 @@ class Run:
         Inputs:
             additional (dict): What's supported by DeepCAVE? Like `ram`, 
             costs (float or list of floats)
+            resources (list of floats): Measured resources of the trial in the order of
+                `deepcave.utils.resources.RESOURCES`.
         """
 
         if not isinstance(costs, list):
@@ -160,22 +265,25 @@ class Run:
             if not objective["lock_lower"]:
                 if cost < objective["lower"]:
                     self.meta["objectives"][i]["lower"] = cost
+                    self._meta_changed = True
 
             if not objective["lock_upper"]:
                 if cost > objective["upper"]:
                     self.meta["objectives"][i]["upper"] = cost
+                    self._meta_changed = True
 
         if isinstance(config, Configuration):
             config = config.get_dictionary()
 
-        if config not in self.configs.values():
+        config_hash = config_to_hash(config)
+        if config_hash not in self.config_ids:
             config_id = len(self.configs)
             self.configs[config_id] = config
+            self.config_ids[config_hash] = config_id
             self.origins[config_id] = origin
         else:
-            config_id = self.get_config_id(config)
+            config_id = self.config_ids[config_hash]
 
-        config_id = self.get_config_id(config)
         trial = Trial(
             config_id=config_id,
             budget=budget,
@@ -183,23 +291,241 @@ class Run:
             start_time=np.round(start_time, 2),
             end_time=np.round(end_time, 2),
             status=status,
-            additional=additional
+            additional=additional,
+            resources=resources
         )
 
-        trial_key = trial.get_key()
-        if trial_key not in self.trial_keys:
-            self.trial_keys[trial_key] = len(self.history)
-            self.history.append(trial)
-        else:
-            self.history[self.trial_keys[trial_key]] = trial
+        trial_key = self._add_trial(trial)
 
         # Update budgets
         if budget not in self.meta["budgets"]:
             self.meta["budgets"].append(budget)
             self.meta["budgets"].sort()
+            self._meta_changed = True
 
         # Update models
-        self.models[trial_key] = model
+        if model is not None:
+            self.models[trial_key] = model
+
+        self.version += 1
+
+    def extend(self,
+               costs,
+               configs,
+               budgets=np.inf,
+               start_times=0.,
+               end_times=0.,
+               statuses=Status.SUCCESS,
+               origins=None,
+               additionals=None,
+               resources=None):
+        """
+        Adds many trials at once (e.g. to import the history of an optimizer).
+        Same as calling `add` for every trial, but configs are deduplicated in one pass,
+        and bounds and budgets are only updated once.
+
+        Args:
+            costs (np.ndarray or list): Costs of shape (n_trials, ) or (n_trials, n_objectives).
+                Use None or NaN for missing costs.
+            configs (list of dict or Configuration): Configs of the trials.
+            budgets (float or list): Budget per trial, or one budget for all trials.
+            start_times (float or list): Start time per trial, or one for all trials.
+            end_times (float or list): End time per trial, or one for all trials.
+            statuses (Status or list of Status): Status per trial, or one for all trials.
+            origins (list): Origin per trial. Only used for new configs.
+            additionals (list of dict): Additional data per trial.
+            resources (np.ndarray): Measured resources of shape (n_trials, len(RESOURCES)).
+                Use None or NaN for resources which were not measured.
+        """
+
+        n = len(configs)
+        if n == 0:
+            return
+
+        def broadcast(values):
+            # Plain python values for the keys and meta
+            if isinstance(values, (np.ndarray, np.generic)):
+                values = values.tolist()
+
+            if np.ndim(values) == 0:
+                return [values] * n
+
+            assert len(values) == n
+            return list(values)
+
+        budgets = broadcast(budgets)
+        statuses = [Status(status) for status in broadcast(statuses)]
+        start_times = np.broadcast_to(np.array(start_times, dtype=np.float64), n)
+        end_times = np.broadcast_to(np.array(end_times, dtype=np.float64), n)
+        if origins is None:
+            origins = [None] * n
+        if additionals is None:
+            additionals = [{}] * n
+
+        costs = np.array(costs, dtype=np.float64).reshape(n, -1)
+        if resources is None:
+            resources = np.full((n, len(RESOURCES)), np.nan)
+        else:
+            resources = np.array(resources, dtype=np.float64).reshape(n, len(RESOURCES))
+        assert costs.shape[1] == len(self.meta["objectives"])
+
+        for i, objective in enumerate(self.meta["objectives"]):
+            # Update time objective here
+            if objective["name"] == "time":
+                missing = np.isnan(costs[:, i])
+                costs[missing, i] = (end_times - start_times)[missing]
+
+            column = costs[:, i][~np.isnan(costs[:, i])]
+            if len(column) == 0:
+                continue
+
+            # Update bounds here
+            if not objective["lock_lower"] and column.min() < objective["lower"]:
+                self.meta["objectives"][i]["lower"] = float(column.min())
+                self._meta_changed = True
+
+            if not objective["lock_upper"] and column.max() > objective["upper"]:
+                self.meta["objectives"][i]["upper"] = float(column.max())
+                self._meta_changed = True
+
+        # Same as in `add`, the times are rounded after the time objective was calculated
+        start_times = np.round(start_times, 2)
+        end_times = np.round(end_times, 2)
+
+        # Deduplicate the configs
+        # Trials often share the same config object, which is only hashed once
+        config_ids = np.empty(n, dtype=np.int64)
+        object_config_ids = {}
+        for i, (config, origin) in enumerate(zip(configs, origins)):
+            config_id = object_config_ids.get(id(config))
+            if config_id is None:
+                config_dict = config
+                if isinstance(config, Configuration):
+                    config_dict = config.get_dictionary()
+
+                config_hash = config_to_hash(config_dict)
+                config_id = self.config_ids.get(config_hash)
+                if config_id is None:
+                    config_id = len(self.configs)
+                    self.configs[config_id] = config_dict
+                    self.config_ids[config_hash] = config_id
+                    self.origins[config_id] = origin
+
+                object_config_ids[id(config)] = config_id
+
+            config_ids[i] = config_id
+
+        # Trials with new keys are appended at once, the others overwrite the existing ones
+        budget_column = np.array(
+            [np.nan if budget is None else budget for budget in budgets], dtype=np.float64)
+        keys = History.get_keys(config_ids, budget_column)
+        first = np.zeros(n, dtype=bool)
+        first[np.unique(keys, return_index=True)[1]] = True
+        existing = self.history.find_many(keys) >= 0
+        new = np.flatnonzero(first & ~existing).tolist()
+        overwrite = np.flatnonzero(~first | existing).tolist()
+
+        # Budgets keep their type (e.g. int)
+        self.history.add_budgets(budgets)
+        self.history.extend(
+            [additionals[i] for i in new],
+            config_ids=config_ids[new],
+            budgets=budget_column[new],
+            costs=costs[new],
+            start_times=start_times[new],
+            end_times=end_times[new],
+            statuses=np.array([statuses[i] for i in new], dtype=np.int8),
+            resources=resources[new],
+        )
+
+        for i in overwrite:
+            trial_resources = None
+            if not np.all(np.isnan(resources[i])):
+                trial_resources = [None if value != value else value
+                                   for value in resources[i].tolist()]
+
+            self._add_trial(Trial(
+                config_id=int(config_ids[i]),
+                budget=budgets[i],
+                costs=[None if cost != cost else cost for cost in costs[i].tolist()],
+                start_time=float(start_times[i]),
+                end_time=float(end_times[i]),
+                status=statuses[i],
+                additional=additionals[i],
+                resources=trial_resources
+            ))
+
+        # Update budgets
+        new_budgets = set(budgets) - set(self.meta["budgets"])
+        if len(new_budgets) > 0:
+            self.meta["budgets"] = sorted(set(self.meta["budgets"]) | new_budgets)
+            self._meta_changed = True
+
+        self.version += 1
+
+    def __getstate__(self):
+        # The unpickled run should not depend on the files anymore
+        self._load_lazy_data()
+
+        # Memoized results are not worth to be pickled
+        state = self.__dict__.copy()
+        state["_encoded_cache"] = LRUCache(maxsize=self._encoded_cache.maxsize)
+        state["_curves"] = None
+        del state["_load_lock"]
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_lock = threading.RLock()
+
+    def _load_lazy_data(self):
+        # Loaded runs read their data on first access (see `__getattr__`)
+        if "history" in self.__dict__ or self.__dict__.get("_path") is None:
+            return
+
+        with self._load_lock:
+            # Another thread might have loaded the data in the meantime
+            if "history" in self.__dict__:
+                return
+
+            # Other threads access the data attributes without `__getattr__` as soon as
+            # they are set. Hence, the data is loaded into a copy and set at once.
+            run = Run.__new__(Run)
+            run.__dict__.update(self.__dict__)
+            run._load_data()
+            self.__dict__.update(run.__dict__)
+
+    def _add_trial(self, trial):
+        """
+        Appends the trial to the history or overwrites the trial with the same key.
+        """
+
+        trial_key = trial.get_key()
+        id = self.history.find(*trial_key)
+        if id is None:
+            self.history.append(trial)
+        else:
+            self.history[id] = trial
+
+            # Already saved trials have to be written again
+            if id < self._saved_trials:
+                self._modified_trials.add(id)
+
+        return trial_key
+
+    def get_trial_ids(self, budgets=None, statuses=None, config_ids=None):
+        """
+        Returns the (sorted) positions of the trials in history which match all given filters.
+        Only the matching trials are touched (see `History.select`).
+
+        Args:
+            budgets (list): Allowed budgets. Use None to allow all budgets.
+            statuses (list of Status): Allowed statuses. Use None to allow all statuses.
+            config_ids (list of int): Allowed config ids. Use None to allow all config ids.
+        """
+
+        return self.history.select(budgets, statuses, config_ids).tolist()
 
     def get_meta(self):
         return self.meta
@@ -234,21 +560,19 @@ class Run:
         return self.configs[id]
 
     def get_config_id(self, config: dict):
-        # Find out config id
-        for id, c in self.configs.items():
-            if c == config:
-                return id
+        if isinstance(config, Configuration):
+            config = config.get_dictionary()
 
-        return None
+        return self.config_ids.get(config_to_hash(config))
 
     def get_configs(self, budget=None):
-        configs = []
-        for trial in self.history:
-            if budget is not None:
-                if budget != trial.budget:
-                    continue
+        budgets = None
+        if budget is not None:
+            budgets = [budget]
 
-            config = self.configs[trial.config_id]
+        configs = []
+        for id in self.get_trial_ids(budgets=budgets):
+            config = self.configs[self.history[id].config_id]
             configs += [config]
 
         return configs
@@ -293,82 +617,75 @@ class Run:
         if budget is None:
             budget = self.get_highest_budget()
 
-        results = {}
-        for trial in self.history:
-            if trial.budget is not None:
-                if trial.budget != budget:
-                    continue
-
-            if statuses is not None:
-                if trial.status not in statuses:
-                    continue
+        # Trials without budget are always included
+        ids = self.get_trial_ids(budgets=[budget, None], statuses=statuses)
+        config_ids = self.history.config_ids[ids].tolist()
+        costs = self._process_costs(self.history.costs[ids]).tolist()
 
-            results[trial.config_id] = self._process_costs(trial.costs)
-
-        return results
+        # Later trials of the same config overwrite the earlier ones
+        return dict(zip(config_ids, costs))
 
     def get_min_cost(self, objective_names=None, budget=None, statuses=None):
-        min_cost = np.inf
-        best_config = None
-
         results = self.get_costs(budget, statuses)
-        for config_id, costs in results.items():
-            cost = self.calculate_cost(costs, objective_names, normalize=True)
+        if len(results) == 0:
+            return np.inf, None
 
-            if cost < min_cost:
-                min_cost = cost
-                best_config = self.get_config(config_id)
+        config_ids = list(results.keys())
+        costs = self.calculate_costs(
+            list(results.values()), objective_names, normalize=True)
 
-        return min_cost, best_config
+        # NaN costs are never the best ones
+        valid = costs < np.inf
+        if not np.any(valid):
+            return np.inf, None
+
+        idx = np.argmin(np.where(valid, costs, np.inf))
+
+        return costs[idx], self.get_config(config_ids[idx])
 
     def _process_costs(self, costs):
         """
         Get rid of none costs.
+
+        Args:
+            costs (np.ndarray or list of lists): Costs of shape (n_trials, n_objectives).
+                None and NaN are replaced by the worst cost of the objective.
+
+        Returns:
+            np.ndarray: Costs of shape (n_trials, n_objectives).
         """
 
-        new_costs = []
-        for idx, cost in enumerate(costs):
-            # Replace with highest cost
-            if cost is None:
-                obj = self.meta["objectives"][idx]
-                if obj["optimize"] == "lower":
-                    cost = obj["upper"]
-                else:
-                    cost = obj["lower"]
+        costs = np.array(costs, dtype=np.float64).reshape(-1, len(self.meta["objectives"]))
+
+        # Replace with highest cost
+        worst_costs = np.array([
+            obj["upper"] if obj["optimize"] == "lower" else obj["lower"]
+            for obj in self.meta["objectives"]
+        ], dtype=np.float64)
 
-            new_costs += [cost]
+        missing = np.isnan(costs)
+        costs[missing] = np.broadcast_to(worst_costs, costs.shape)[missing]
 
-        return new_costs
+        return costs
 
     def get_trajectory(self, objective_names=None, budget=None):
         if budget is None:
             budget = self.get_highest_budget()
 
-        costs = []
-        ids = []
-        times = []
+        # Only consider selected/last budget and sort by end_time
+        ids = np.array(self.get_trial_ids(budgets=[budget]), dtype=np.int64)
+        ids = ids[np.argsort(self.history.end_times[ids], kind="stable")]
 
-        order = []
-        # Sort self.history by end_time
-        for id, trial in enumerate(self.history):
-            order.append((id, trial.end_time))
+        costs = self.calculate_costs(self.history.costs[ids], objective_names)
 
-        order.sort(key=lambda tup: tup[1])
-
-        current_cost = np.inf
-        for id, cost in order:
-            trial = self.history[id]
-            # Only consider selected/last budget
-            if trial.budget != budget:
-                continue
+        # A trial is part of the trajectory if it improves the best cost so far
+        best_costs = np.fmin.accumulate(costs) if len(costs) > 0 else costs
+        previous_best_costs = np.concatenate(([np.inf], best_costs[:-1]))
+        improved = costs < previous_best_costs
 
-            cost = self.calculate_cost(trial.costs, objective_names)
-            if cost < current_cost:
-                current_cost = cost
-
-                costs.append(cost)
-                times.append(trial.end_time)
-                ids.append(id)
+        costs = costs[improved].tolist()
+        times = self.history.end_times[ids[improved]].tolist()
+        ids = ids[improved].tolist()
 
         return costs, times, ids
 
@@ -378,6 +695,22 @@ class Run:
         Normalizes the cost first and weight every cost the same.
         """
 
+        return self.calculate_costs([costs], objective_names, normalize)[0]
+
+    def calculate_costs(self, costs, objective_names=None, normalize=False):
+        """
+        Calculates the costs of multiple trials at once. See `calculate_cost`.
+
+        Args:
+            costs (np.ndarray or list of lists): Costs of shape (n_trials, n_objectives).
+                None and NaN are replaced by the worst cost of the objective.
+            objective_names (list of str): Objectives which are combined. All by default.
+            normalize (bool): Normalize the cost even if only one objective is selected.
+
+        Returns:
+            np.ndarray: Costs of shape (n_trials,).
+        """
+
         costs = self._process_costs(costs)
 
         if objective_names is None:
@@ -387,38 +720,68 @@ class Run:
 
         # No normalization needed
         if len(objective_names) == 1 and not normalize:
-            return costs[0]
+            return costs[:, self.get_objective_names().index(objective_names[0])]
 
         objectives = self.meta["objectives"]
+        selected = np.array([
+            objective["name"] in objective_names for objective in objectives], dtype=bool)
+
+        lower = np.array([objective["lower"] for objective in objectives])[selected]
+        upper = np.array([objective["upper"] for objective in objectives])[selected]
+        flip = np.array([objective["optimize"] == "upper" for objective in objectives])[selected]
 
         # First normalize
-        filtered_objectives = []
-        normalized_costs = []
-        for cost, objective in zip(costs, objectives):
-            if objective["name"] not in objective_names:
-                continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalized_costs = (costs[:, selected] - lower) / (upper - lower)
 
-            a = cost - objective["lower"]
-            b = objective["upper"] - objective["lower"]
-            normalized_cost = a / b
+        # We optimize the lower
+        # So we need to flip the normalized cost
+        normalized_costs[:, flip] = 1 - normalized_costs[:, flip]
 
-            # We optimize the lower
-            # So we need to flip the normalized cost
-            if objective["optimize"] == "upper":
-                normalized_cost = 1 - normalized_cost
+        # Give the same weight to all objectives (for now)
+        normalized_costs *= 1 / len(objectives)
 
-            normalized_costs.append(normalized_cost)
-            filtered_objectives.append(objective)
+        return np.mean(normalized_costs, axis=1)
 
-        # Give the same weight to all objectives (for now)
-        objective_weights = [
-            1 / len(objectives) for _ in range(len(filtered_objectives))
-        ]
+    def get_resources(self, budget=None, statuses=None):
+        """
+        Returns the measured resources of the trials.
+
+        Returns:
+            np.ndarray: Resources of shape (n_trials, len(RESOURCES)). NaN if not measured.
+        """
 
-        costs = [u*v for u, v in zip(normalized_costs, objective_weights)]
-        cost = np.mean(costs)
+        budgets = None
+        if budget is not None:
+            budgets = [budget]
 
-        return cost
+        return self.history.resources[self.get_trial_ids(budgets=budgets, statuses=statuses)]
+
+    def get_instance_costs(self, config_id=None, budget=None):
+        """
+        Returns the costs per instance and seed, if the trials were aggregated from them.
+
+        Args:
+            config_id (int): Only entries of this config. Use None for all configs.
+            budget (float): Only entries of this budget. Use None for all budgets.
+
+        Returns:
+            pd.DataFrame: One row per entry with the columns in `INSTANCE_COLUMNS`, or None if
+                there is no instance table.
+        """
+
+        if self.instance_table is None:
+            return None
+
+        mask = np.ones(len(self.instance_table["config_ids"]), dtype=bool)
+        if config_id is not None:
+            mask &= self.instance_table["config_ids"] == config_id
+        if budget is not None:
+            mask &= self.instance_table["budgets"] == budget
+
+        return pd.DataFrame({
+            name: column[mask] for name, column in self.instance_table.items()
+        })
 
     def empty(self):
         return len(self.history) == 0
@@ -430,60 +793,42 @@ class Run:
                             for_tree=False,
                             pandas=False):
         """
+        The results are memoized until the run changes.
+
         Args:
             for_tree (bool): Inactives are treated differently.
             pandas (bool): Return pandas DataFrame instead of X and Y.
         """
 
-        X = []
-        Y = []
-
-        results = self.get_costs(budget, statuses)
-        for config_id, costs in results.items():
+        key = (
+            self.version,
+            None if objective_names is None else tuple(objective_names),
+            budget,
+            None if statuses is None else tuple(statuses),
+            for_tree,
+            pandas
+        )
 
-            config = self.configs[config_id]
-            config = Configuration(self.configspace, config)
+        if key not in self._encoded_cache:
+            self._encoded_cache[key] = self._get_encoded_configs(
+                objective_names, budget, statuses, for_tree, pandas)
 
-            encoded = config.get_array()
-            cost = self.calculate_cost(costs, objective_names)
+        # Copies are returned because callers might modify the data
+        result = self._encoded_cache[key]
+        if pandas:
+            return result.copy()
 
-            X.append(encoded)
-            Y.append(cost)
+        X, Y = result
+        return X.copy(), Y.copy()
 
-        X = np.array(X)
-        Y = np.array(Y)
+    def _get_encoded_configs(self, objective_names, budget, statuses, for_tree, pandas):
+        results = self.get_costs(budget, statuses)
 
-        # Imputation: Easiest case is to replace all nans with -1
-        # However, since Stefan used different values for inactives
-        # we also have to use different inactives to be compatible
-        # with the random forests.
-        # https://github.com/automl/SMAC3/blob/a0c89502f240c1205f83983c8f7c904902ba416d/smac/epm/base_rf.py#L45
+        X = self._encode_configs(list(results.keys()))
+        Y = self.calculate_costs(list(results.values()), objective_names)
 
-        if not for_tree:
-            X[np.isnan(X)] = -1
-        else:
-            conditional = {}
-            impute_values = {}
-
-            for idx, hp in enumerate(self.configspace.get_hyperparameters()):
-                if idx not in conditional:
-                    parents = self.configspace.get_parents_of(hp.name)
-                    if len(parents) == 0:
-                        conditional[idx] = False
-                    else:
-                        conditional[idx] = True
-                        if isinstance(hp, CategoricalHyperparameter):
-                            impute_values[idx] = len(hp.choices)
-                        elif isinstance(hp, (UniformFloatHyperparameter, UniformIntegerHyperparameter)):
-                            impute_values[idx] = -1
-                        elif isinstance(hp, Constant):
-                            impute_values[idx] = 1
-                        else:
-                            raise ValueError
-
-                if conditional[idx] is True:
-                    nonfinite_mask = ~np.isfinite(X[:, idx])
-                    X[nonfinite_mask, idx] = impute_values[idx]
+        # Imputation: Inactives are replaced with (hyperparameter-specific) values
+        X = self._get_encoder().impute(X, for_tree=for_tree)
 
         if pandas:
             cost_column = self.get_objective_name(objective_names)
@@ -500,9 +845,189 @@ class Run:
 
         return X, Y
 
-    def save(self, path=None):
+    def _get_encoder(self):
+        if self._encoder is None:
+            self._encoder = ConfigEncoder(self.configspace)
+
+        return self._encoder
+
+    def _encode_configs(self, config_ids):
+        """
+        Returns the encoded (not imputed) configs. Config ids are consecutive, so the encoded
+        configs are cached in a matrix. Only configs which were added since the last call
+        are encoded.
+        """
+
+        encoder = self._get_encoder()
+        if self._encoded_configs is None:
+            self._encoded_configs = np.empty((0, len(encoder.hyperparameters)))
+
+        n_encoded = len(self._encoded_configs)
+        if n_encoded < len(self.configs):
+            configs = [self.configs[config_id] for config_id in range(n_encoded, len(self.configs))]
+            self._encoded_configs = np.concatenate(
+                (self._encoded_configs, encoder.encode(configs)))
+
+        return self._encoded_configs[np.array(config_ids, dtype=np.int64)]
+
+    def get_curve_dtype(self):
+        """
+        Returns the record type of curves.bin. Every record is one step of a trial
+        with one value per objective. All records of a `write_steps` call have the same
+        write time, which is used to find the latest curve of a trial.
+        """
+
+        return np.dtype([
+            ("config_id", "<i8"),
+            ("budget", "<f8"),
+            ("written", "<f8"),
+            ("step", "<f8"),
+            ("values", "<f8", (len(self.meta["objectives"]), )),
+        ])
+
+    def write_steps(self, config_id, budget, steps, values):
+        """
+        Appends steps of a trial (e.g. a learning curve) to curves.bin.
+        Other than trials, the steps are not kept in memory but written directly.
+        Same as trials, a curve which is written again for the same trial replaces the old one.
+
+        Args:
+            config_id (int): Config id of the trial.
+            budget (float): Budget of the trial.
+            steps (list of float): Steps (e.g. epochs).
+            values (list of list of float): Values per step and objective.
+        """
+
+        if self.path is None:
+            raise RuntimeError("Please specify a path to save the steps.")
+
+        records = np.empty(len(steps), dtype=self.get_curve_dtype())
+        records["config_id"] = config_id
+        records["budget"] = np.nan if budget is None else budget
+        records["written"] = time.time()
+        records["step"] = steps
+        records["values"] = np.array(values, dtype=np.float64).reshape(len(steps), -1)
+
+        with open(self.curves_fn, "ab") as f:
+            # Records which were torn by a crash would shift all following records
+            size = f.seek(0, os.SEEK_END)
+            if size % records.itemsize != 0:
+                f.truncate(size - size % records.itemsize)
+
+            records.tofile(f)
+
+    def get_curve(self, config_id, budget, max_steps=None):
+        """
+        Returns the logged steps of a trial in the order they were logged.
+        Only curves.bin is read (memory-mapped), the history is not loaded.
+
+        Args:
+            config_id (int): Config id of the trial.
+            budget (float): Budget of the trial (None if it was started without budget).
+            max_steps (int): If given, the curve is downsampled to at most `max_steps`
+                evenly spaced steps. The first and last step are always kept.
+
+        Returns:
+            steps (np.ndarray): Steps of shape (n_steps, ).
+            values (np.ndarray): Values of shape (n_steps, n_objectives).
+        """
+
+        records, index = self._load_curves()
+        ids = index.get((config_id, budget))
+        if ids is None:
+            return np.empty(0), np.empty((0, len(self.meta["objectives"])))
+
+        if max_steps is not None and len(ids) > max_steps:
+            ids = ids[np.unique(np.linspace(0, len(ids) - 1, max_steps).round().astype(np.int64))]
+
+        return np.asarray(records["step"][ids]), np.asarray(records["values"][ids])
+
+    def _load_curves(self):
+        """
+        Memory-maps the curve files and groups the records by trial.
+        Reloaded only if the files changed.
+        """
+
+        # Config ids of the shards are only known after merging
+        if self._shards is not None:
+            self._load_lazy_data()
+
+        if self._shard_sources is None:
+            sources = [(self.curves_fn, None)]
+        else:
+            sources = [
+                (os.path.join(shard_path, "curves.bin"), mapping)
+                for shard_path, mapping in self._shard_sources
+            ]
+
+        dtype = self.get_curve_dtype()
+        stats = [self._get_stat(filename) for filename, _ in sources]
+        if self._curves is not None and self._curves[0] == stats:
+            return self._curves[1:]
+
+        parts = []
+        for (filename, mapping), stat in zip(sources, stats):
+            # An incomplete last record is ignored
+            n_records = 0 if stat is None else stat[1] // dtype.itemsize
+            if n_records == 0:
+                continue
+
+            records = np.memmap(filename, dtype=dtype, mode="r", shape=(n_records, ))
+            if mapping is not None:
+                records = np.array(records)
+                records["config_id"] = mapping[records["config_id"]]
+
+            parts.append(records)
+
+        if len(parts) == 0:
+            records = np.empty(0, dtype=dtype)
+        elif len(parts) == 1:
+            records = parts[0]
+        else:
+            records = np.concatenate(parts)
+
+        # Only the latest curve of a trial is kept
+        budgets, budget_codes = np.unique(records["budget"], return_inverse=True)
+        keys = records["config_id"] * max(len(budgets), 1) + budget_codes.reshape(-1)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        written = np.full(len(unique_keys), -np.inf)
+        np.maximum.at(written, inverse, records["written"])
+        latest = records["written"] == written[inverse]
+
+        # Group the (stable) sorted positions by config id and budget
+        order = np.argsort(keys, kind="stable")
+        order = order[latest[order]]
+        _, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+
+        index = {}
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            id = int(order[start])
+            budget = float(records["budget"][id])
+            if budget != budget:
+                budget = None
+
+            index[(int(records["config_id"][id]), budget)] = order[start:end]
+
+        self._curves = (stats, records, index)
+
+        return records, index
+
+    def save(self, path=None, journal=False, snapshot=False, fsync=True):
         """
         If path is none, self.path will be chosen.
+        Models are written to the models directory and are not kept in memory afterwards.
+
+        Args:
+            journal (bool): Only append what changed since the last save: New trials
+                (and overwritten ones) are appended to history.jsonl, new configs and origins to
+                their delta files. Meta is only rewritten if budgets or bounds changed.
+                Falls back to a full save if the run was not saved to or loaded from the path before.
+            snapshot (bool): Also write the history as binary snapshot. As long as the snapshot
+                is up to date, it is loaded instead of history.jsonl.
+            fsync (bool): Sync the written files to disk. Files are always replaced atomically,
+                but only synced files survive a crash of the machine.
         """
 
         if path is not None:
@@ -511,29 +1036,313 @@ class Run:
         if self.path is None:
             raise RuntimeError("Please specify a path to save the trials.")
 
-        # Save configspace
-        with open(self.configspace_fn, 'w') as f:
-            f.write(cs_json.write(self.configspace))
-
-        # Save meta data (could be changed)
-        with open(self.meta_fn, 'w') as f:
-            json.dump(self.meta, f, indent=4)
+        if journal and self._saved_path == self.path and self.exists():
+            self._save_journal(fsync)
+        else:
+            self._save_all(fsync)
 
-        with open(self.configs_fn, 'w') as f:
-            json.dump(self.configs, f, indent=4)
+        # Written last, so that it is newer than the sources
+        if snapshot:
+            self._save_snapshot(fsync)
 
-        with open(self.origins_fn, 'w') as f:
-            json.dump(self.origins, f, indent=4)
+        self._saved_path = self.path
+        self._saved_trials = len(self.history)
+        self._saved_configs = len(self.configs)
+        self._modified_trials = set()
+        self._meta_changed = False
 
-        # Save history
-        with jsonlines.open(self.history_fn, mode='w') as f:
-            for trial in self.history:
-                f.write(trial)
+        # Models are not kept in memory once they are saved
+        for (config_id, budget), model in self.models.items():
+            self.save_model(config_id, budget, model)
+        self.models = {}
 
         # TODO: Update general cache file and tell him that self.path was used
         # to save the run.
         # Then, DeepCAVE can show direct suggestions in the select path dialog.
 
+    def sync(self):
+        """
+        Syncs the files of the run to disk, e.g. after it was saved with `fsync=False`.
+        """
+
+        if self.path is None:
+            return
+
+        sync_files([
+            self.meta_fn, self.configspace_fn, self.configs_fn, self.origins_fn,
+            self.instances_fn, self.history_fn, self.curves_fn, self.configs_delta_fn,
+            self.origins_delta_fn
+        ])
+
+    def save_model(self, config_id, budget, model, max_size=None, keep_last=10, keep=None):
+        """
+        Pickles the model of a trial to the models directory.
+        If the models exceed `max_size`, the oldest models are removed. The incumbents and
+        the last `keep_last` saved models are always kept.
+
+        Args:
+            config_id (int): Config id of the trial.
+            budget (float): Budget of the trial.
+            model: Any picklable object.
+            max_size (int): Maximum size of all models in bytes. Use None for no limit.
+            keep_last (int): Number of recently saved models which are never removed.
+            keep (list of tuple): Trial keys of the models which are never removed.
+                If None, the incumbents of all budgets are kept.
+        """
+
+        if self.path is None:
+            raise RuntimeError("Please specify a path to save the model.")
+
+        filename = self._get_model_fn(self.path, config_id, budget)
+        make_dirs(filename)
+
+        # Readers never see incomplete models
+        with AtomicWriter() as writer:
+            pickle.dump(model, writer.open(filename, "wb"))
+
+        if max_size is not None:
+            self.evict_models(max_size, keep_last, keep)
+
+    def get_model(self, config_id, budget):
+        """
+        Returns the model of a trial. Models are only read from disk if they are requested.
+
+        Args:
+            config_id (int): Config id of the trial.
+            budget (float): Budget of the trial (None if it was started without budget).
+
+        Returns:
+            The model or None if no model was saved (or it was removed).
+        """
+
+        model = self.models.get((config_id, budget))
+        if model is not None:
+            return model
+
+        if self._shards is not None:
+            self._load_lazy_data()
+
+        if self._shard_sources is None:
+            filenames = [self._get_model_fn(self.path, config_id, budget)]
+        else:
+            # Config ids of the shards differ from the merged ones
+            filenames = [
+                self._get_model_fn(shard_path, shard_config_id, budget)
+                for shard_path, mapping in self._shard_sources
+                for shard_config_id in np.flatnonzero(mapping == config_id).tolist()
+            ]
+
+        for filename in reversed(filenames):
+            try:
+                with open(filename, "rb") as f:
+                    return pickle.load(f)
+            except FileNotFoundError:
+                continue
+
+        return None
+
+    def get_incumbent_keys(self):
+        """
+        Returns the trial keys of the best trials of every budget.
+        """
+
+        keys = []
+        for budget in self.meta["budgets"]:
+            _, config = self.get_min_cost(budget=budget)
+            if config is not None:
+                keys.append((self.get_config_id(config), budget))
+
+        return keys
+
+    def evict_models(self, max_size, keep_last=10, keep=None):
+        """
+        Removes the oldest models until all models fit into `max_size` bytes.
+
+        Args:
+            max_size (int): Maximum size of all models in bytes.
+            keep_last (int): Number of recently saved models which are never removed.
+            keep (list of tuple): Trial keys of the models which are never removed.
+                If None, the incumbents of all budgets are kept. They are only determined
+                if models have to be removed.
+        """
+
+        if self.path is None or not os.path.isdir(self.models_dir):
+            return
+
+        entries = []
+        for entry in os.scandir(self.models_dir):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        size = sum(entry[1] for entry in entries)
+        if size <= max_size:
+            return
+
+        if keep is None:
+            keep = self.get_incumbent_keys()
+
+        keep = set(self._get_model_fn(self.path, config_id, budget) for config_id, budget in keep)
+
+        entries.sort()
+        if keep_last > 0:
+            entries = entries[:-keep_last]
+
+        for _, entry_size, filename in entries:
+            if size <= max_size:
+                break
+
+            if filename in keep:
+                continue
+
+            try:
+                os.remove(filename)
+                size -= entry_size
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _get_model_fn(path, config_id, budget):
+        if budget is not None:
+            budget = float(budget)
+
+        return os.path.join(path, "models", f"{config_id}_{budget}.pkl")
+
+    def _save_all(self, fsync=True):
+        # The files are replaced in this order, so that the history never refers to
+        # unknown configs
+        with AtomicWriter(fsync) as writer:
+            # Save configspace
+            writer.open(self.configspace_fn).write(cs_json.write(self.configspace))
+
+            # Save meta data (could be changed)
+            json.dump(self.meta, writer.open(self.meta_fn), indent=4)
+            json.dump(self.configs, writer.open(self.configs_fn), indent=4)
+            json.dump(self.origins, writer.open(self.origins_fn), indent=4)
+
+            # Save history
+            jsonlines.Writer(writer.open(self.history_fn)).write_all(self.history)
+
+            if self.instance_table is not None:
+                np.savez(writer.open(self.instances_fn, "wb"), **self.instance_table)
+
+        if self.instance_table is None and os.path.isfile(self.instances_fn):
+            os.remove(self.instances_fn)
+
+        # Deltas are included in the full files now
+        for filename in [self.configs_delta_fn, self.origins_delta_fn]:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def _save_journal(self, fsync=True):
+        # Appended lines are torn at worst, which is repaired before the next append
+        with AtomicWriter(fsync) as writer:
+            config_ids = range(self._saved_configs, len(self.configs))
+            if len(config_ids) > 0:
+                jsonlines.Writer(writer.append(self.configs_delta_fn)).write_all(
+                    [config_id, self.configs[config_id]] for config_id in config_ids)
+                jsonlines.Writer(writer.append(self.origins_delta_fn)).write_all(
+                    [config_id, self.origins[config_id]] for config_id in config_ids)
+
+            # Overwritten trials are replayed by `load`
+            ids = sorted(self._modified_trials) + \
+                list(range(self._saved_trials, len(self.history)))
+            if len(ids) > 0:
+                jsonlines.Writer(writer.append(self.history_fn)).write_all(
+                    self.history[id] for id in ids)
+
+            if self._meta_changed:
+                json.dump(self.meta, writer.open(self.meta_fn), indent=4)
+
+    def _save_snapshot(self, fsync=True):
+        make_dirs(self.snapshot_fn)
+
+        # A snapshot without header is never loaded
+        if os.path.isfile(self.snapshot_fn):
+            os.remove(self.snapshot_fn)
+
+        with AtomicWriter(fsync) as writer:
+            for name in History.columns:
+                filename = os.path.join(self.snapshot_dir, name + ".npy")
+                np.save(writer.open(filename, "wb"), getattr(self.history, name))
+
+        header = {
+            "n_trials": len(self.history),
+            # Only non-empty ones
+            "additionals": {
+                id: additional for id, additional in enumerate(self.history.additionals)
+                if additional is not None
+            },
+            # Sizes of the sources to check if the snapshot is up to date
+            "sources": self._get_snapshot_sources(),
+        }
+
+        # The header is written last, so that the columns are complete
+        with AtomicWriter(fsync) as writer:
+            json.dump(header, writer.open(self.snapshot_fn))
+
+    def _get_snapshot_sources(self):
+        sources = {}
+        for filename in [self.history_fn, self.configs_fn, self.origins_fn,
+                         self.configs_delta_fn, self.origins_delta_fn]:
+            stat = self._get_stat(filename)
+            if stat is not None:
+                sources[os.path.basename(filename)] = stat[1]
+
+        return sources
+
+    def _load_snapshot(self):
+        """
+        Loads the history from the snapshot if it is newer than the sources.
+        The columns are memory-mapped.
+
+        Returns:
+            bool: Whether the snapshot was loaded.
+        """
+
+        snapshot_stat = self._get_stat(self.snapshot_fn)
+        if snapshot_stat is None:
+            return False
+
+        with open(self.snapshot_fn) as f:
+            header = json.load(f)
+
+        if header["sources"] != self._get_snapshot_sources():
+            return False
+
+        for filename in [self.history_fn, self.configs_fn, self.origins_fn,
+                         self.configs_delta_fn, self.origins_delta_fn]:
+            stat = self._get_stat(filename)
+            if stat is not None and stat[0] > snapshot_stat[0]:
+                return False
+
+        # Nothing to map and the number of objectives is unknown
+        if header["n_trials"] == 0:
+            return False
+
+        # Written before all columns existed
+        for name in History.columns:
+            if not os.path.isfile(os.path.join(self.snapshot_dir, name + ".npy")):
+                return False
+
+        columns = {
+            name: np.load(os.path.join(self.snapshot_dir, name + ".npy"), mmap_mode="r")
+            for name in History.columns
+        }
+
+        additionals = [None] * header["n_trials"]
+        for id, additional in header["additionals"].items():
+            additionals[int(id)] = additional
+
+        self.history = History.from_columns(additionals, **columns)
+        self.history.add_budgets(self.meta["budgets"])
+
+        # The history file is completely covered by the snapshot
+        if "history.jsonl" in header["sources"]:
+            self._offsets[self.history_fn] = header["sources"]["history.jsonl"]
+
+        return True
+
     def load(self, path=None):
         self.reset()
 
@@ -544,72 +1353,221 @@ class Run:
             raise RuntimeError(
                 "Could not load trials because trials were not found.")
 
-        # Load meta data
-        with open(self.meta_fn) as f:
-            self.meta = json.load(f)
+        shard_paths = self.get_shard_paths(self.path)
+        if len(shard_paths) > 0:
+            # The shards are loaded lazily as well
+            self._shards = [Run(path=shard_path) for shard_path in shard_paths]
+            self._merge_shard_meta()
+            self.configspace = self._shards[0].configspace
+        else:
+            # Load meta data
+            self._load_meta()
+
+            # Load configspace
+            with open(self.configspace_fn, 'r') as f:
+                self.configspace = cs_json.read(f.read())
+
+        # Configs, origins and history are loaded on first access.
+        # Meta and configspace are often enough (e.g. for budgets and objectives).
+        for name in Run._data_attributes:
+            delattr(self, name)
 
-        # Load configspace
-        with open(self.configspace_fn, 'r') as f:
-            self.configspace = cs_json.read(f.read())
+        # Models are loaded on demand by `get_model`
+
+    def _load_data(self):
+        if self._shards is not None:
+            return self._merge_shards()
+
+        self._reset_data()
 
         # Load configs
         with open(self.configs_fn) as f:
             configs = json.load(f)
-            self.configs = {int(k): v for k, v in configs.items()}
             # Make sure all keys are integers
+            self.configs = {int(k): v for k, v in configs.items()}
 
         # Load origins
         with open(self.origins_fn) as f:
-            self.origins = json.load(f)
+            origins = json.load(f)
+            self.origins = {int(k): v for k, v in origins.items()}
 
-        # Load history
-        with jsonlines.open(self.history_fn) as f:
-            self.history = []
-            for obj in f:
-                # Create trial object here
-                trial = Trial(*obj)
-                self.history.append(trial)
+        self.config_ids = {
+            config_to_hash(config): config_id for config_id, config in self.configs.items()}
 
-                # Also create trial_keys
-                self.trial_keys[trial.get_key()] = len(self.history) - 1
+        # Full files are only rewritten by a full save
+        self._configs_stat = self._get_stat(self.configs_fn)
 
-        # Load models
-        # TODO
+        if os.path.isfile(self.instances_fn):
+            with np.load(self.instances_fn) as instance_table:
+                self.instance_table = {name: instance_table[name] for name in Run.INSTANCE_COLUMNS}
 
+        # Prefer the (up to date) binary snapshot over history.jsonl
+        self._load_snapshot()
 
-class Trial(tuple):
-    def __new__(cls, *args, **kwargs):
+        # Replay the journaled configs and origins and load the (rest of the) history
+        self._load_tail()
 
-        if len(kwargs) > 0:
-            return super(Trial, cls).__new__(cls, tuple(kwargs.values()))
-        else:
-            return super(Trial, cls).__new__(cls, tuple(args))
+    def refresh(self):
+        """
+        Loads only what was appended to the files since the last load, and extends
+        the run in place. Used for runs which are still recording.
+        Falls back to a full load if the files were rewritten in the meantime.
+        Sharded runs are always loaded completely.
+        """
 
-    def __init__(self,
-                 config_id,
-                 budget,
-                 costs,
-                 start_time,
-                 end_time,
-                 status,
-                 additional):
-
-        if isinstance(status, int):
-            status = Status(status)
-
-        data = {
-            "config_id": config_id,
-            "budget": budget,
-            "costs": costs,
-            "start_time": start_time,
-            "end_time": end_time,
-            "status": status,
-            "additional": additional
-        }
+        if self._saved_path is None or self._saved_path != self.path:
+            return self.load()
+
+        rewritten = self._get_stat(self.configs_fn) != self._configs_stat
+        for filename, offset in self._offsets.items():
+            stat = self._get_stat(filename)
+            if stat is None or stat[1] < offset:
+                rewritten = True
+
+        if rewritten:
+            return self.load()
+
+        self._load_meta()
+        self._load_tail()
+
+    def _merge_shard_meta(self):
+        """
+        Combines the meta data of the shards: Bounds of the objectives are widened,
+        budgets are united and times are relative to the earliest shard.
+        """
+
+        meta = dict(self._shards[0].meta)
+        objectives = [dict(objective) for objective in meta["objectives"]]
+        budgets = set()
+        start_times = []
+        for shard in self._shards:
+            for objective, shard_objective in zip(objectives, shard.meta["objectives"]):
+                objective["lower"] = min(objective["lower"], shard_objective["lower"])
+                objective["upper"] = max(objective["upper"], shard_objective["upper"])
+
+            budgets.update(shard.meta["budgets"])
+            if "start_time" in shard.meta:
+                start_times.append(shard.meta["start_time"])
+
+        meta["objectives"] = objectives
+        meta["budgets"] = sorted(budgets)
+        if len(start_times) > 0:
+            meta["start_time"] = min(start_times)
+
+        self.meta = meta
+
+    def _merge_shards(self):
+        """
+        Merges the data of the shards in end time order.
+        Config ids are reconciled by the hashes of the configs.
+        """
+
+        self._reset_data()
+        shards, self._shards = self._shards, None
+        self._shard_sources = []
+
+        columns = {name: [] for name in History.columns}
+        additionals = []
+        for shard in shards:
+            history = shard.history
+            if len(history) == 0:
+                continue
+
+            mapping = np.empty(len(shard.configs), dtype=np.int64)
+            for config_id, config in shard.configs.items():
+                config_hash = config_to_hash(config)
+                if config_hash not in self.config_ids:
+                    new_config_id = len(self.configs)
+                    self.configs[new_config_id] = config
+                    self.config_ids[config_hash] = new_config_id
+                    self.origins[new_config_id] = shard.origins[config_id]
+
+                mapping[config_id] = self.config_ids[config_hash]
+
+            self._shard_sources.append((shard.path, mapping))
+
+            # Every shard measures the times from its own start
+            offset = 0.
+            if "start_time" in shard.meta:
+                offset = shard.meta["start_time"] - self.meta["start_time"]
+
+            columns["config_ids"].append(mapping[history.config_ids])
+            columns["budgets"].append(history.budgets)
+            columns["costs"].append(history.costs)
+            columns["start_times"].append(np.round(history.start_times + offset, 2))
+            columns["end_times"].append(np.round(history.end_times + offset, 2))
+            columns["statuses"].append(history.statuses)
+            columns["resources"].append(history.resources)
+            additionals += history.additionals
+
+        if len(additionals) > 0:
+            order = np.argsort(np.concatenate(columns["end_times"]), kind="stable")
+            columns = {name: np.concatenate(arrays)[order] for name, arrays in columns.items()}
+            additionals = [additionals[id] for id in order.tolist()]
+
+            # Shards recorded the same trial: The later one overwrites the earlier one,
+            # but keeps the position of the earlier one
+            keys = History.get_keys(columns["config_ids"], columns["budgets"])
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            if len(first) < len(keys):
+                last = np.zeros(len(first), dtype=np.int64)
+                np.maximum.at(last, inverse.reshape(-1), np.arange(len(keys)))
+                order = last[np.argsort(first)]
+                columns = {name: column[order] for name, column in columns.items()}
+                additionals = [additionals[id] for id in order.tolist()]
+
+            self.history = History.from_columns(additionals, **columns)
+            self.history.add_budgets(self.meta["budgets"])
+
+        self.version += 1
+
+    def _load_meta(self):
+        with open(self.meta_fn) as f:
+            self.meta = json.load(f)
+
+    def _load_tail(self):
+        """
+        Reads the delta files and the history starting at the last offsets.
+        """
+
+        for config_id, config in self._read_jsonlines(self.configs_delta_fn):
+            self.configs[config_id] = config
+            self.config_ids[config_to_hash(config)] = config_id
+
+        for config_id, origin in self._read_jsonlines(self.origins_delta_fn):
+            self.origins[config_id] = origin
+
+        for obj in self._read_jsonlines(self.history_fn):
+            # Create trial object here
+            # Journaled trials with the same key overwrite the previous ones.
+            self._add_trial(Trial(*obj))
 
-        # Make dict available as member variables
-        for k, v in data.items():
-            setattr(self, k, v)
+        self._saved_path = self.path
+        self._saved_trials = len(self.history)
+        self._saved_configs = len(self.configs)
+        self._modified_trials = set()
+        self._meta_changed = False
+
+        self.version += 1
+
+    def _read_jsonlines(self, filename):
+        """
+        Yields the objects of the complete lines after the last read offset of the file.
+        """
+
+        if not os.path.isfile(filename):
+            return
+
+        offset = self._offsets.get(filename, 0)
+        for obj, offset in read_jsonlines(filename, offset):
+            self._offsets[filename] = offset
+            yield obj
+
+    @staticmethod
+    def _get_stat(filename):
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
 
-    def get_key(self):
-        return (self.config_id, self.budget)
+        return (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,79 @@
+from enum import IntEnum
+
+
+class Status(IntEnum):
+    SUCCESS = 1
+    TIMEOUT = 2
+    MEMORYOUT = 3
+    CRASHED = 4
+    ABORTED = 5
+    RUNNING = 6
+
+
+class Trial(tuple):
+    """
+    Immutable view of a single trial. The fields are only stored once (in the tuple itself)
+    and are accessed by properties.
+
+    Resources (see `deepcave.utils.resources.RESOURCES`) are optional and only part of the
+    tuple if they were measured.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls,
+                config_id,
+                budget,
+                costs,
+                start_time,
+                end_time,
+                status,
+                additional,
+                resources=None):
+
+        if isinstance(status, int):
+            status = Status(status)
+
+        fields = (config_id, budget, costs, start_time, end_time, status, additional)
+        if resources is not None:
+            fields += (resources, )
+
+        return super(Trial, cls).__new__(cls, fields)
+
+    @property
+    def config_id(self):
+        return self[0]
+
+    @property
+    def budget(self):
+        return self[1]
+
+    @property
+    def costs(self):
+        return self[2]
+
+    @property
+    def start_time(self):
+        return self[3]
+
+    @property
+    def end_time(self):
+        return self[4]
+
+    @property
+    def status(self):
+        return self[5]
+
+    @property
+    def additional(self):
+        return self[6]
+
+    @property
+    def resources(self):
+        if len(self) > 7:
+            return self[7]
+
+        return None
+
+    def get_key(self):
+        return (self.config_id, self.budget)
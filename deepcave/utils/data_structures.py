@@ -1,3 +1,6 @@
+from collections import OrderedDict
+
+
 def update_dict(a, b):
     """
     Updates a from b inplace.
@@ -9,3 +12,26 @@ def update_dict(a, b):
 
         for k2, v2 in v1.items():
             a[k1][k2] = v2
+
+
+class LRUCache(OrderedDict):
+    """
+    Dictionary which only keeps the `maxsize` most recently used entries.
+    """
+
+    def __init__(self, maxsize=8):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
@@ -1,4 +1,6 @@
 import os
+import re
+import json
 
 
 def make_dirs(filename):
@@ -7,3 +9,312 @@ def make_dirs(filename):
     path = "/".join(filename_array)
 
     os.makedirs(path, exist_ok=True)
+
+
+def read_head(filename, size=1024):
+    """
+    Reads the beginning of a file (without leading whitespace), e.g. to sniff its format.
+
+    Returns:
+        bytes: At most `size` bytes. Empty if the file can not be read.
+    """
+
+    try:
+        with open(filename, "rb") as f:
+            return f.read(size).lstrip()
+    except OSError:
+        return b""
+
+
+def read_jsonlines(filename, offset=0):
+    """
+    Reads a jsonlines file starting at the byte offset. Only complete lines are read, i.e.
+    a line which is still being written (or was torn by a crash) is skipped.
+
+    Yields:
+        The parsed object and the offset after its line.
+    """
+
+    with open(filename, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+
+            if line.strip():
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    # Only the last line can be torn
+                    if f.read(1):
+                        raise
+
+                    break
+
+                offset += len(line)
+                yield obj, offset
+            else:
+                offset += len(line)
+
+
+def iter_json_items(filename, chunk_size=1 << 20):
+    """
+    Parses a file with a JSON object incrementally, so that memory is bounded by the size
+    of the largest item (and not the file). The members of nested arrays and objects
+    are yielded one by one.
+
+    Yields:
+        For every member of the object, the key, the subkey and the value. The subkey is the
+        index for arrays, the name for objects and None for everything else.
+    """
+
+    with open(filename, encoding="utf-8") as f:
+        reader = _JSONReader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+
+        while True:
+            key = reader.decode()
+            reader.expect(":")
+
+            char = reader.peek()
+            if char == "[" or char == "{":
+                closing = "]" if char == "[" else "}"
+                reader.pos += 1
+
+                index = 0
+                if reader.peek() != closing:
+                    while True:
+                        if char == "{":
+                            subkey = reader.decode()
+                            reader.expect(":")
+                        else:
+                            subkey = index
+                            index += 1
+
+                        yield key, subkey, reader.decode()
+
+                        if reader.peek() != ",":
+                            break
+                        reader.pos += 1
+
+                reader.expect(closing)
+            else:
+                yield key, None, reader.decode()
+
+            if reader.peek() != ",":
+                break
+            reader.pos += 1
+
+        reader.expect("}")
+
+
+class _JSONReader:
+    """
+    Decodes JSON values from a file, which is read in chunks.
+    """
+
+    _whitespace = re.compile(r"[ \t\n\r]*")
+    _decoder = json.JSONDecoder()
+
+    # Characters which can continue a number. No other value can be followed by them.
+    _number_chars = frozenset("0123456789.eE+-")
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character without consuming it.
+        """
+
+        while True:
+            self.pos = self._whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+
+            if not self._read():
+                raise ValueError(f"Unexpected end of {self.f.name}.")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at position {self.pos} in {self.f.name}.")
+
+        self.pos += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+
+                # Numbers could continue in the next chunk (e.g. after "." or "e")
+                if self.eof or (end < len(self.buffer) and
+                                self.buffer[end] not in self._number_chars):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+            self._read()
+
+    def _read(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        # Only the unconsumed part is kept
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+        return True
+
+
+def repair_jsonlines(filename):
+    """
+    Removes a torn last line (e.g. after a crash), so that new lines can be appended.
+    """
+
+    if not os.path.isfile(filename):
+        return
+
+    with open(filename, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+
+        # Search the end of the last complete line
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            chunk = f.read(end - start)
+            idx = chunk.rfind(b"\n")
+            if idx >= 0:
+                f.truncate(start + idx + 1)
+                return
+
+            end = start
+
+        f.truncate(0)
+
+
+def sync_dir(path):
+    """
+    Makes renames and new files in the directory durable. Not supported on all platforms.
+    """
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def sync_files(filenames):
+    """
+    Syncs existing files and their directories to disk, e.g. after they were written without sync.
+    """
+
+    paths = set()
+    for filename in filenames:
+        try:
+            fd = os.open(filename, os.O_RDONLY)
+        except OSError:
+            continue
+
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        paths.add(os.path.dirname(filename))
+
+    for path in paths:
+        sync_dir(path)
+
+
+class AtomicWriter:
+    """
+    Writes files atomically: Every file is written to a temporary file first, and all files
+    are moved to their targets (in the order they were opened) when the writer is committed.
+    A crash therefore never leaves a truncated file behind.
+
+    Files can also be appended to. They are not moved, but a torn last line is removed first.
+
+    The files are synced once per commit: First all written files, then the directories.
+
+    Usage:
+        with AtomicWriter() as writer:
+            f = writer.open(filename)
+            f.write(...)
+    """
+
+    def __init__(self, fsync=True):
+        self.fsync = fsync
+        self._files = []  # [(file, temporary filename, filename)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def open(self, filename, mode="w"):
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        f = open(tmp_filename, mode)
+        self._files.append((f, tmp_filename, filename))
+
+        return f
+
+    def append(self, filename, mode="a"):
+        repair_jsonlines(filename)
+        f = open(filename, mode)
+        self._files.append((f, None, filename))
+
+        return f
+
+    def commit(self):
+        for f, _, _ in self._files:
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            f.close()
+
+        for _, tmp_filename, filename in self._files:
+            if tmp_filename is not None:
+                os.replace(tmp_filename, filename)
+
+        if self.fsync:
+            for path in set(os.path.dirname(filename) for _, _, filename in self._files):
+                sync_dir(path)
+
+        self._files = []
+
+    def abort(self):
+        for f, tmp_filename, _ in self._files:
+            f.close()
+            if tmp_filename is not None and os.path.isfile(tmp_filename):
+                os.remove(tmp_filename)
+
+        self._files = []
@@ -1,4 +1,15 @@
+import os
+import json
+import numbers
 import hashlib
+import numpy as np
+
+
+# Size of the head and tail blocks which are hashed by `file_to_fingerprint`
+_BLOCK_SIZE = 1 << 16
+
+# Fingerprints of the files: {(path, full): (stat, fingerprint)}
+_fingerprints = {}
 
 
 def string_to_hash(string):
@@ -13,3 +24,68 @@ def file_to_hash(filename):
             hash.update(chunk)
 
         return hash.hexdigest()
+
+
+def file_to_fingerprint(filename, full=False):
+    """
+    Cheap identifier of a file's content. Hashes the size as well as the first and last
+    block of the file, so that appended or rewritten files get a new fingerprint.
+    The fingerprint is memoized per path and only recomputed if size, mtime or inode changed,
+    which means unchanged files cost a single `stat()`.
+
+    Args:
+        filename (str): Path to the file.
+        full (bool): Hashes the whole file instead, e.g. if changes in the middle of a file
+            with constant size must be detected.
+
+    Returns:
+        str: Fingerprint of the file.
+    """
+
+    stat = os.stat(filename)
+    key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    memo = _fingerprints.get((filename, full))
+    if memo is not None and memo[0] == key:
+        return memo[1]
+
+    if full:
+        fingerprint = file_to_hash(filename)
+    else:
+        hash = hashlib.md5(str(stat.st_size).encode())
+        with open(filename, "rb") as f:
+            hash.update(f.read(_BLOCK_SIZE))
+            if stat.st_size > _BLOCK_SIZE:
+                f.seek(max(_BLOCK_SIZE, stat.st_size - _BLOCK_SIZE))
+                hash.update(f.read(_BLOCK_SIZE))
+
+        fingerprint = hash.hexdigest()
+
+    _fingerprints[(filename, full)] = (key, fingerprint)
+
+    return fingerprint
+
+
+def config_to_hash(config):
+    """
+    Canonical hash of a configuration dictionary. Insertion order does not matter and
+    numbers are compared by value, i.e. `1` and `1.0` are the same (as with `==`).
+    """
+
+    config = {key: _normalize_value(value) for key, value in config.items()}
+
+    return string_to_hash(json.dumps(config, sort_keys=True))
+
+
+def _normalize_value(value):
+    if isinstance(value, (float, str)):
+        return value
+
+    # Booleans are numbers as well, but json writes them differently
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+
+    if isinstance(value, numbers.Real):
+        return float(value)
+
+    return value
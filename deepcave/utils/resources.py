@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+
+# Order of the resource fields of a trial
+RESOURCES = ["peak_memory", "cpu_time", "wall_time"]
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_memory():
+    """
+    Returns the resident set size of the current process in MB, read from /proc.
+    None if /proc is not available.
+    """
+
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1024 / 1024
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def get_cpu_time():
+    """
+    Returns the user and system time of the current process in seconds.
+    """
+
+    times = os.times()
+    return times.user + times.system
+
+
+class ResourceSampler:
+    """
+    Measures the resources of the current process while trials are running.
+    A single background thread samples the memory of all running trials, and is only
+    started with the first trial.
+    """
+
+    def __init__(self, interval=0.1):
+        """
+        Args:
+            interval (float): Seconds between two memory samples.
+        """
+
+        self.interval = interval
+        self._trials = {}  # {id: [peak_memory, cpu_time, wall_time]}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, id):
+        """
+        Starts measuring a trial.
+        """
+
+        with self._lock:
+            self._trials[id] = [get_memory(), get_cpu_time(), time.time()]
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+
+    def stop(self, id):
+        """
+        Stops measuring a trial.
+
+        Returns:
+            list: Peak memory (MB), cpu time (s) and wall time (s) of the trial.
+                The peak memory is None if it can not be measured.
+        """
+
+        memory = get_memory()
+        with self._lock:
+            peak_memory, cpu_time, wall_time = self._trials.pop(id)
+
+        if memory is not None and peak_memory is not None:
+            peak_memory = max(peak_memory, memory)
+
+        return [peak_memory, get_cpu_time() - cpu_time, time.time() - wall_time]
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            memory = get_memory()
+            if memory is None:
+                continue
+
+            with self._lock:
+                for resources in self._trials.values():
+                    if resources[0] is not None and memory > resources[0]:
+                        resources[0] = memory
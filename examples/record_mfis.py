@@ -21,7 +21,7 @@ if __name__ == "__main__":
                 r.start(config, budget)
 
                 cost = config["start"]
-                cost_history = {1: cost}
+                r.log_step(1, 1 - cost)
                 for i in range(2, budget+1):
                     if config["penalty"]:
                         cost += random.uniform(0, 0.02) * \
@@ -32,9 +32,8 @@ if __name__ == "__main__":
                     if cost > 1:
                         cost = 1.
 
-                    cost_history[int(i)] = 1 - cost
+                    r.log_step(i, 1 - cost)
 
-                r.end(costs=1 - cost,
-                      additional={"cost_history": cost_history})
+                r.end(costs=1 - cost)
 
                 time.sleep(1)
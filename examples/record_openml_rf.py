@@ -1,4 +1,5 @@
 from functools import partial
+import numpy as np
 from absl import app as flags_app
 from absl import flags
 from smac.facade.smac_hpo_facade import SMAC4HPO
@@ -49,19 +50,21 @@ def main(argv):
     smac.optimize()
 
     rh = smac.get_runhistory()
-    very_start_time = None
 
-    with Recorder(cs, prefix=f"rf_openml_{task_id}_smac_{seed}", overwrite=True) as r:
-        for (config_id, instance_id, seed, budget), (cost, time, status, starttime, endtime, additional_info) in rh.data.items():
-            config = rh.ids_config[config_id]
-            if very_start_time is None:
-                very_start_time = starttime
+    configs, costs, starttimes, endtimes = [], [], [], []
+    for (config_id, instance_id, _seed, budget), (cost, time, status, starttime, endtime, additional_info) in rh.data.items():
+        configs.append(rh.ids_config[config_id])
+        costs.append(cost)
+        starttimes.append(starttime)
+        endtimes.append(endtime)
 
-            starttime = starttime - very_start_time
-            endtime = endtime - very_start_time
+    very_start_time = starttimes[0]
+    starttimes = np.array(starttimes) - very_start_time
+    endtimes = np.array(endtimes) - very_start_time
 
-            r.start(config, start_time=starttime)
-            r.end(costs=cost, end_time=endtime)
+    # All trials are saved at once (without budget, as SMAC did not use budgets here)
+    with Recorder(cs, prefix=f"rf_openml_{task_id}_smac_{seed}", overwrite=True) as r:
+        r.add_many(configs, costs, budgets=None, start_times=starttimes, end_times=endtimes)
 
     #-------- START RANDOM SEARCH --------#
     with Recorder(cs, prefix=f"rf_openml_{task_id}_rs_{seed}", overwrite=True) as r:
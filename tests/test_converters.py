@@ -0,0 +1,100 @@
+import json
+import os
+
+import numpy as np
+import ConfigSpace as CS
+from ConfigSpace.read_and_write import json as cs_json
+
+from deepcave.runs.converters.smac import SMAC
+from deepcave.runs.trial import Status
+
+
+def write_smac_run(path, scenario, entries):
+    """
+    Args:
+        entries (list): (config_id, instance, seed, cost, status) per entry.
+    """
+
+    configspace = CS.ConfigurationSpace(seed=0)
+    configspace.add_hyperparameter(CS.UniformFloatHyperparameter("a", 0, 1))
+
+    os.makedirs(path)
+    with open(os.path.join(path, "configspace.json"), "w") as f:
+        f.write(cs_json.write(configspace))
+
+    with open(os.path.join(path, "scenario.txt"), "w") as f:
+        f.write(scenario)
+
+    data = []
+    for i, (config_id, instance, seed, cost, status) in enumerate(entries):
+        data.append([
+            [config_id, instance, seed, 0.0],
+            [cost, 1.0, {"__enum__": f"StatusType.{status}"}, 10. + i, 11. + i, {}]
+        ])
+
+    configs = {str(config_id): {"a": config_id / 10} for config_id, *_ in entries}
+    with open(os.path.join(path, "runhistory.json"), "w") as f:
+        json.dump({"data": data, "config_origins": {}, "configs": configs}, f)
+
+
+def test_smac_failures_are_penalized(tmp_path):
+    write_smac_run(str(tmp_path / "run"), "run_obj = quality\n", [
+        (1, "i1", 0, 0.5, "SUCCESS"),
+        (1, "i2", 0, 0.5, "SUCCESS"),
+        (2, "i1", 0, 0.1, "SUCCESS"),
+        (2, "i2", 0, 0.0, "CRASHED"),
+        (3, "i1", 0, 0.0, "CRASHED"),
+        (3, "i2", 0, 0.0, "CRASHED"),
+    ])
+
+    run = SMAC().get_run(str(tmp_path), "run")
+    costs = [trial.costs[0] for trial in run.history]
+    statuses = [trial.status for trial in run.history]
+
+    # The crashes count as the worst cost (0.5)
+    assert np.allclose(costs, [0.5, 0.3, 0.5])
+    assert statuses == [Status.SUCCESS, Status.SUCCESS, Status.CRASHED]
+    assert run.meta["Aggregation"] == "Mean (failures count as worst cost)"
+    assert len(run.get_instance_costs()) == 6
+
+
+def test_smac_par10(tmp_path):
+    write_smac_run(str(tmp_path / "run"), "run_obj = runtime\ncutoff = 5\n", [
+        (1, "i1", 0, 2.0, "SUCCESS"),
+        (1, "i2", 0, 5.0, "TIMEOUT"),
+    ])
+
+    run = SMAC().get_run(str(tmp_path), "run")
+    assert run.history[0].costs == [26.0]
+    assert run.meta["Aggregation"] == "PAR10"
+
+
+def test_smac_par10_without_success(tmp_path):
+    write_smac_run(str(tmp_path / "run"), "run_obj = runtime\ncutoff = 5\n", [
+        (1, "i1", 0, 2.0, "SUCCESS"),
+        (1, "i2", 0, 5.0, "TIMEOUT"),
+        (2, "i1", 0, 5.0, "TIMEOUT"),
+        (2, "i2", 0, 5.0, "TIMEOUT"),
+    ])
+
+    run = SMAC().get_run(str(tmp_path), "run")
+    assert run.get_costs() == {0: [26.0], 1: [50.0]}
+    assert run.history[1].status == Status.TIMEOUT
+
+
+def test_smac_without_aggregation(tmp_path):
+    write_smac_run(str(tmp_path / "run"), "run_obj = runtime\ncutoff = 5\n", [
+        (1, "i1", 0, 2.0, "SUCCESS"),
+        (2, "i2", 0, 3.0, "SUCCESS"),
+        (3, "i1", 0, 5.0, "TIMEOUT"),
+    ])
+
+    run = SMAC().get_run(str(tmp_path), "run")
+    assert len(run.history) == 3
+    assert run.history[2].costs == [None]
+    assert "Aggregation" not in run.meta
+
+    # The instances are still known
+    instance_costs = run.get_instance_costs()
+    assert instance_costs["instances"].tolist() == ["i1", "i2", "i1"]
+    assert instance_costs["config_ids"].tolist() == [0, 1, 2]
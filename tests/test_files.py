@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from deepcave.utils.files import iter_json_items
+
+
+def dump(tmp_path, obj):
+    filename = str(tmp_path / "data.json")
+    with open(filename, "w") as f:
+        json.dump(obj, f)
+
+    return filename
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 20])
+def test_iter_json_items(tmp_path, chunk_size):
+    obj = {
+        "data": [821505.610679429, -1.5e-07, 2E+10, 0, -12, [1.25, {"a": [3.5e3]}]],
+        "configs": {"1": {"x": 0.001, "y": "z"}, "2": {"x": 1e100}},
+        "value": 123.456,
+        "flags": [True, False, None],
+        "empty": [],
+    }
+
+    items = list(iter_json_items(dump(tmp_path, obj), chunk_size=chunk_size))
+    assert items == [
+        ("data", 0, 821505.610679429),
+        ("data", 1, -1.5e-07),
+        ("data", 2, 2E+10),
+        ("data", 3, 0),
+        ("data", 4, -12),
+        ("data", 5, [1.25, {"a": [3.5e3]}]),
+        ("configs", "1", {"x": 0.001, "y": "z"}),
+        ("configs", "2", {"x": 1e100}),
+        ("value", None, 123.456),
+        ("flags", 0, True),
+        ("flags", 1, False),
+        ("flags", 2, None),
+    ]
+
+
+def test_iter_json_items_without_whitespace(tmp_path):
+    filename = str(tmp_path / "data.json")
+    with open(filename, "w") as f:
+        f.write('{"data":[821505.610679429,1e-5],"n":-7}')
+
+    items = list(iter_json_items(filename, chunk_size=1))
+    assert items == [("data", 0, 821505.610679429), ("data", 1, 1e-5), ("n", None, -7)]
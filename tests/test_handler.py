@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+
+from test_converters import write_smac_run
+
+
+# Like server.py, the script creates the handler on import, outside of the main guard.
+# The spawned processes import the script again.
+SERVER_SCRIPT = """
+import json
+import os
+import sys
+import types
+
+import deepcave
+from deepcave.config import CONFIG
+from deepcave.runs.converters import register_converter
+from deepcave.runs.converters.smac import SMAC
+
+
+@register_converter
+class PidSMAC(SMAC):
+    # Remembers the process which converted the run
+
+    def get_run(self, working_dir, run_name):
+        run = super().get_run(working_dir, run_name)
+        run.meta["pid"] = os.getpid()
+
+        return run
+
+
+class Cache:
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key):
+        return json.loads(json.dumps(self.values[key]))
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+working_dir, cache_dir = sys.argv[1:3]
+CONFIG["CACHE_DIR"] = cache_dir
+CONFIG["LOAD_PROCESSES"] = 2
+
+run_names = sorted(os.listdir(working_dir))
+deepcave.c = Cache({
+    "working_dir": working_dir, "run_ids": {name: None for name in run_names}, "groups": {}})
+deepcave.rc = types.SimpleNamespace(switch=lambda working_dir, run_names: None)
+
+from deepcave.runs.handler import handler  # noqa
+
+if __name__ == "__main__":
+    print(json.dumps({
+        "pid": os.getpid(),
+        "pids": [run.meta["pid"] for run in handler.runs.values()],
+        "paths": [run.path for run in handler.runs.values()],
+    }))
+"""
+
+
+def test_convert_runs_in_processes(tmp_path):
+    working_dir = tmp_path / "runs"
+    for i in range(3):
+        write_smac_run(str(working_dir / f"run{i}"), "run_obj = quality\n", [
+            (1, "i1", 0, 0.5 + i, "SUCCESS"),
+        ])
+
+    # Not named server.py, which would start the Dash app
+    script = tmp_path / "app.py"
+    script.write_text(SERVER_SCRIPT)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    output = subprocess.run(
+        [sys.executable, str(script), str(working_dir), str(tmp_path / "cache")],
+        env=env, capture_output=True, text=True, check=True).stdout
+
+    result = json.loads(output.splitlines()[-1])
+    assert len(result["pids"]) == 3
+    assert result["pid"] not in result["pids"]
+    assert result["paths"] == [None] * 3
@@ -0,0 +1,14 @@
+import numpy as np
+
+from deepcave.utils.hash import config_to_hash
+
+
+def test_config_to_hash_order():
+    assert config_to_hash({"a": 1, "b": "x"}) == config_to_hash({"b": "x", "a": 1})
+
+
+def test_config_to_hash_numbers():
+    assert config_to_hash({"a": 1}) == config_to_hash({"a": 1.0})
+    assert config_to_hash({"a": np.int64(1)}) == config_to_hash({"a": 1.0})
+    assert config_to_hash({"a": 1}) != config_to_hash({"a": 1.5})
+    assert config_to_hash({"a": True}) != config_to_hash({"a": 1})
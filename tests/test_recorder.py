@@ -0,0 +1,56 @@
+import ConfigSpace as CS
+
+from deepcave.runs.objective import Objective
+from deepcave.runs.recorder import Recorder
+from deepcave.runs.run import Run
+
+
+def create_configspace():
+    configspace = CS.ConfigurationSpace(seed=0)
+    configspace.add_hyperparameter(CS.UniformFloatHyperparameter("a", 0, 1))
+
+    return configspace
+
+
+def test_curve_of_rerun_trial(tmp_path):
+    configspace = create_configspace()
+    config = CS.Configuration(configspace, {"a": 0.5})
+
+    with Recorder(configspace, objectives=[Objective("cost")], save_path=str(tmp_path)) as r:
+        for run in range(2):
+            r.start(config)
+            for step in range(2):
+                r.log_step(step, 10 * run + step)
+            r.end(costs=1.)
+
+    run = Run(path=r.path)
+    assert len(run.history) == 1
+
+    # Only the curve of the last run
+    steps, values = run.get_curve(0, None)
+    assert steps.tolist() == [0, 1]
+    assert values[:, 0].tolist() == [10, 11]
+
+
+def test_incumbents_only_for_eviction(tmp_path, monkeypatch):
+    configspace = create_configspace()
+    calls = []
+    get_incumbent_keys = Run.get_incumbent_keys
+    monkeypatch.setattr(
+        Run, "get_incumbent_keys", lambda self: calls.append(1) or get_incumbent_keys(self))
+
+    with Recorder(configspace, objectives=[Objective("cost")], save_path=str(tmp_path),
+                  max_models_size=1 << 20, keep_last_models=1) as r:
+        for i in range(10):
+            r.start(CS.Configuration(configspace, {"a": i / 10}))
+            r.end(costs=abs(i - 3), model=[i] * 1000)
+
+    # The models fit, so the incumbents were not needed
+    assert calls == []
+
+    # Only the incumbent and the last model are kept
+    r.run.evict_models(1, keep_last=1)
+    assert len(calls) == 1
+    assert r.run.get_model(3, None) == [3] * 1000
+    assert r.run.get_model(9, None) == [9] * 1000
+    assert r.run.get_model(0, None) is None
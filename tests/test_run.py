@@ -0,0 +1,146 @@
+import threading
+
+import numpy as np
+import ConfigSpace as CS
+
+from deepcave.runs.objective import Objective
+from deepcave.runs.run import Run
+from deepcave.runs.trial import Status
+
+
+def create_run():
+    configspace = CS.ConfigurationSpace(seed=0)
+    configspace.add_hyperparameter(CS.UniformFloatHyperparameter("a", 0, 1))
+
+    return Run(configspace=configspace, objectives=[Objective("cost"), Objective("time")])
+
+
+def test_budget_type(tmp_path):
+    run = create_run()
+    run.add([0.5, None], {"a": 0.1}, budget=20)
+    run.extend([[0.5, None]], [{"a": 0.2}], budgets=[20])
+    run.add([0.5, None], {"a": 0.3}, budget=2.5)
+
+    for trial in run.history[:2]:
+        assert type(trial.budget) is int
+    assert run.history[2].budget == 2.5
+
+    run.save(str(tmp_path), snapshot=True)
+    loaded = Run(path=str(tmp_path))
+    assert [trial.budget for trial in loaded.history] == [20, 20, 2.5]
+    assert type(loaded.history[0].budget) is int
+
+
+def test_overwrite_trial():
+    run = create_run()
+    for i in range(2000):
+        run.add([i, None], {"a": i / 2000}, budget=i % 3, status=Status.SUCCESS)
+
+    run.add([5, None], {"a": 1 / 2000}, budget=1, status=Status.CRASHED)
+    assert len(run.history) == 2000
+    assert run.history[1].status == Status.CRASHED
+    assert run.get_trial_ids(statuses=[Status.CRASHED]) == [1]
+    assert run.get_trial_ids(budgets=[1], statuses=[Status.SUCCESS]) == list(range(4, 2000, 3))
+    assert run.get_trial_ids(budgets=[None]) == []
+
+
+def test_save_loaded_run_to_new_path(tmp_path):
+    run = create_run()
+    for i in range(10):
+        run.add([i, None], {"a": i / 10}, budget=1, start_time=i, end_time=i + 1)
+    run.save(str(tmp_path / "a"))
+
+    # Nothing was accessed yet
+    loaded = Run(path=str(tmp_path / "a"))
+    loaded.save(str(tmp_path / "b"))
+
+    saved = Run(path=str(tmp_path / "b"))
+    assert saved.configs == run.configs
+    assert list(saved.history) == list(run.history)
+
+    # Snapshots as well
+    Run(path=str(tmp_path / "b")).save(str(tmp_path / "c"), snapshot=True)
+    assert list(Run(path=str(tmp_path / "c")).history) == list(run.history)
+
+
+def test_get_trial_ids():
+    rng = np.random.RandomState(0)
+    run = create_run()
+    budgets = [1, 3.5, 9]
+
+    def check():
+        trials = list(run.history)
+        for selected_budgets in [None, [1], [None, 9], [2]]:
+            for statuses in [None, [Status.SUCCESS], [Status.CRASHED, Status.TIMEOUT]]:
+                for config_ids in [None, [0, 5], [10000]]:
+                    expected = [
+                        id for id, trial in enumerate(trials)
+                        if (selected_budgets is None or trial.budget in selected_budgets)
+                        and (statuses is None or trial.status in statuses)
+                        and (config_ids is None or trial.config_id in config_ids)
+                    ]
+                    assert run.get_trial_ids(selected_budgets, statuses, config_ids) == expected
+
+    for i in range(3000):
+        budget = budgets[rng.randint(3)]
+        status = [Status.SUCCESS, Status.CRASHED, Status.TIMEOUT][rng.randint(3)]
+        run.add([1., None], {"a": float(rng.randint(500)) / 500}, budget=budget, status=status)
+
+        # The indexes are updated while trials are added and overwritten
+        if i in [50, 2000, 2999]:
+            check()
+
+    # Missing budgets
+    run = create_run()
+    for i in range(5):
+        run.add([1., None], {"a": i / 5}, budget=None)
+    assert run.get_trial_ids(budgets=[None]) == [0, 1, 2, 3, 4]
+    assert run.get_trial_ids(budgets=[1]) == []
+
+
+def test_load_in_threads(tmp_path):
+    run = create_run()
+    run.extend([[i, None] for i in range(20000)], [{"a": i / 20000} for i in range(20000)])
+    run.save(str(tmp_path))
+
+    for _ in range(3):
+        loaded = Run(path=str(tmp_path))
+        barrier = threading.Barrier(4)
+        lengths = []
+
+        def read():
+            barrier.wait()
+            lengths.append((len(loaded.configs), len(loaded.history)))
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # No thread sees partially loaded data
+        assert lengths == [(20000, 20000)] * 4
+
+
+def test_extend_same_as_add():
+    rng = np.random.RandomState(0)
+    n = 200
+    configs = [{"a": float(rng.randint(50)) / 50} for _ in range(n)]
+    costs = [[float(rng.rand()) if rng.rand() < 0.9 else None, None] for _ in range(n)]
+    budgets = rng.choice([1, 3, 9], n).tolist()
+    start_times = rng.rand(n) * 100
+    end_times = start_times + rng.rand(n) * 10
+    statuses = [Status.SUCCESS if rng.rand() < 0.8 else Status.CRASHED for _ in range(n)]
+
+    added = create_run()
+    for i in range(n):
+        added.add(list(costs[i]), configs[i], budget=budgets[i], start_time=start_times[i],
+                  end_time=end_times[i], status=statuses[i])
+
+    extended = create_run()
+    extended.extend(costs, configs, budgets=budgets, start_times=start_times,
+                    end_times=end_times, statuses=statuses)
+
+    assert extended.meta == added.meta
+    assert extended.configs == added.configs
+    assert list(extended.history) == list(added.history)